@@ -1,12 +1,452 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, Menu, filedialog, simpledialog
-from minio import Minio
+from tkinter import font as tkfont
+import bisect
+import fnmatch
+import heapq
 import json
 import os
 import platform
+import queue
+import re
+import sqlite3
 import threading
-from concurrent.futures import ThreadPoolExecutor, TimeoutError, as_completed
-from urllib3 import PoolManager, Timeout
+import time
+from datetime import datetime
+from minio_manager import SyncManifest, TransferEngine, TransferProgress, create_client, describe_event
+from minio_manager.compression import available_codecs
+from minio_manager.engine import (
+    MANIFEST_PATH, PROGRESS_LOG_LINES, SNOWBALL_BATCH_SIZE, UPLOAD_WORKERS, prefix_end
+)
+from minio_manager.jobs import QUEUE_PATH, QueueRunner, TransferQueue
+from minio_manager.metrics import Instrumentation, registry, timed_listing
+from minio_manager.scheduler import TransferScheduler
+
+# จำนวน object สูงสุดที่แสดงต่อหนึ่งหน้าในโหมด lazy browsing
+LIST_PAGE_SIZE = 1000
+PLACEHOLDER_TEXT = "Loading..."
+LOAD_MORE_TEXT = "Load more..."
+# ขนาด batch ที่ worker ส่งเข้าคิว และเวลาที่ main loop ใช้ประมวลผลคิวต่อรอบ (วินาที)
+LISTING_BATCH_SIZE = 200
+LISTING_DRAIN_BUDGET = 0.03
+LISTING_POLL_MS = 50
+
+# รอบการอัปเดตหน้าจอ progress (ms) และจำนวนไฟล์ที่แสดงแถบความคืบหน้า
+PROGRESS_TICK_MS = 250
+PROGRESS_ACTIVE_ROWS = 8
+
+# ช่วงเวลาขั้นต่ำระหว่างการ refresh โฟลเดอร์ output อัตโนมัติหลังดาวน์โหลด (ms)
+OUTPUT_REFRESH_MS = 1000
+
+# เวลารอหลังพิมพ์ก่อนเริ่มค้นหา (ms)
+SEARCH_DEBOUNCE_MS = 200
+
+# รอบการอัปเดตตารางคิวดาวน์โหลด (ms)
+QUEUE_REFRESH_MS = 1000
+
+# cache ของผลการ list object และอายุเริ่มต้นของข้อมูล (วินาที)
+CACHE_PATH = "minio_cache.sqlite"
+CACHE_TTL = 300
+
+
+class TreeModel:
+    """In-memory index of a Treeview (the bucket tree or the output folder tree).
+
+    Maps a full path (``bucket/folder/file``) to its node id and back, so
+    inserts and path lookups never have to walk the Tk tree.
+    """
+
+    def __init__(self, tree):
+        self.tree = tree
+        self.node_by_path = {}
+        self.path_by_node = {}
+        self.children = {}
+        self.files = set()
+
+    def clear(self):
+        self.tree.delete(*self.tree.get_children())
+        self.node_by_path.clear()
+        self.path_by_node.clear()
+        self.children.clear()
+        self.files.clear()
+
+    def insert(self, parent, name, is_file=False, **kwargs):
+        parent_path = self.path_by_node.get(parent, '')
+        path = f"{parent_path}/{name}" if parent_path else name
+        node = self.node_by_path.get(path)
+        if node:
+            return node
+        tags = ('file',) if is_file else ()
+        node = self.tree.insert(parent, 'end', text=name, tags=tags, **kwargs)
+        self._register(parent_path, path, node, is_file)
+        return node
+
+    def ensure_path(self, path, is_file=False):
+        # ใช้ dict หา parent โดยตรง ไม่ต้องไล่ทีละ segment ถ้าโฟลเดอร์มีอยู่แล้ว
+        node = self.node_by_path.get(path)
+        if node:
+            return node
+        parent_path, _, name = path.rpartition('/')
+        parent = self.ensure_path(parent_path) if parent_path else ''
+        return self.insert(parent, name, is_file=is_file)
+
+    def _register(self, parent_path, path, node, is_file):
+        self.node_by_path[path] = node
+        self.path_by_node[node] = path
+        self.children.setdefault(parent_path, {})[path] = None
+        if is_file:
+            self.files.add(path)
+
+    def remove(self, node):
+        path = self.path_by_node.get(node)
+        if path is not None:
+            parent_path = path.rpartition('/')[0]
+            self.children.get(parent_path, {}).pop(path, None)
+            stack = [path]
+            while stack:
+                current = stack.pop()
+                stack.extend(self.children.pop(current, ()))
+                self.path_by_node.pop(self.node_by_path.pop(current, None), None)
+                self.files.discard(current)
+        self.tree.delete(node)
+
+    def node(self, path):
+        return self.node_by_path.get(path)
+
+    def path(self, node):
+        return self.path_by_node.get(node)
+
+
+class ObjectIndex:
+    """Sorted index of listed objects for search.
+
+    Full paths (``bucket/key``) are kept in a sorted list, so prefix and glob
+    queries bisect straight to their key range. Lists sorted by size and by
+    last-modified time answer range filters the same way. New listings are
+    merged in lazily on the next query.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.meta = {}
+        self.paths = []
+        self.pending = []
+        self.removed = False
+        self.by_size = None
+        self.by_date = None
+
+    def __len__(self):
+        return len(self.meta)
+
+    def clear(self):
+        with self.lock:
+            self.meta = {}
+            self.paths = []
+            self.pending = []
+            self.removed = False
+            self.by_size = self.by_date = None
+
+    def add(self, entries):
+        """Add ``(path, size, modified)`` tuples; ``modified`` is a POSIX timestamp or None."""
+        with self.lock:
+            for path, size, modified in entries:
+                if path not in self.meta:
+                    self.pending.append(path)
+                self.meta[path] = (size, modified)
+            self.by_size = self.by_date = None
+
+    def discard(self, path):
+        with self.lock:
+            if self.meta.pop(path, None) is not None:
+                self.removed = True
+                self.by_size = self.by_date = None
+
+    def discard_prefix(self, prefix):
+        with self.lock:
+            self._merge()
+            start = bisect.bisect_left(self.paths, prefix)
+            bound = prefix_end(prefix)
+            end = bisect.bisect_left(self.paths, bound) if bound is not None else len(self.paths)
+            for path in self.paths[start:end]:
+                del self.meta[path]
+            # สร้าง list ใหม่แทนการแก้ของเดิม เพราะการค้นหาที่กำลังทำงานอาจอ่าน list เดิมอยู่
+            self.paths = self.paths[:start] + self.paths[end:]
+            self.by_size = self.by_date = None
+
+    def _merge(self):
+        if self.removed:
+            self.paths = [path for path in self.paths if path in self.meta]
+            self.removed = False
+        if self.pending:
+            self.pending = [path for path in self.pending if path in self.meta]
+            self.pending.sort()
+            self.paths = list(heapq.merge(self.paths, self.pending))
+            self.pending = []
+
+    def _snapshot(self, by_size, by_date):
+        with self.lock:
+            self._merge()
+            if by_size and self.by_size is None:
+                self.by_size = sorted((size or 0, path) for path, (size, _) in self.meta.items())
+            if by_date and self.by_date is None:
+                self.by_date = sorted((modified, path) for path, (_, modified) in self.meta.items()
+                                      if modified is not None)
+            return self.paths, self.by_size, self.by_date
+
+    def search(self, pattern='', mode='prefix', min_size=None, max_size=None, after=None, before=None):
+        """Yield ``(path, size, modified)`` for every object matching all given filters.
+
+        ``mode`` is ``prefix``, ``glob`` or ``regex``; the glob and regex
+        patterns are matched against the whole ``bucket/key`` path. Sizes are
+        in bytes and dates are POSIX timestamps, both inclusive. Results are
+        produced lazily so callers can show them while the scan continues.
+        """
+        # compile ก่อนเริ่ม scan เพื่อให้ pattern ที่ผิดแจ้ง error ทันที
+        if mode == 'regex':
+            literal, matcher = '', re.compile(pattern).search
+        elif mode == 'glob':
+            literal = re.split(r'[*?\[]', pattern, 1)[0]
+            matcher = re.compile(fnmatch.translate(pattern)).match
+        else:
+            literal, matcher = pattern, None
+        return self._scan(literal, matcher, min_size, max_size, after, before)
+
+    def _scan(self, literal, matcher, min_size, max_size, after, before):
+        has_size = min_size is not None or max_size is not None
+        has_date = after is not None or before is not None
+        paths, by_size, by_date = self._snapshot(has_size, has_date)
+
+        # เลือกดัชนีที่ให้ช่วงผู้สมัครแคบที่สุด แล้วตรวจเงื่อนไขที่เหลือทีละรายการ
+        start = bisect.bisect_left(paths, literal)
+        bound = prefix_end(literal)
+        end = bisect.bisect_left(paths, bound) if bound is not None else len(paths)
+        candidates = ((path,) for path in paths[start:end])
+        count = end - start
+        if has_size:
+            start = bisect.bisect_left(by_size, (min_size or 0,))
+            end = bisect.bisect_left(by_size, (max_size + 1,)) if max_size is not None else len(by_size)
+            if end - start < count:
+                candidates, count = ((path,) for _, path in by_size[start:end]), end - start
+        if has_date:
+            start = bisect.bisect_left(by_date, (after,)) if after is not None else 0
+            end = bisect.bisect_right(by_date, (before, '\uffff')) if before is not None else len(by_date)
+            if end - start < count:
+                candidates = ((path,) for _, path in by_date[start:end])
+
+        meta = self.meta
+        for (path,) in candidates:
+            entry = meta.get(path)
+            if entry is None or not path.startswith(literal):
+                continue
+            size, modified = entry
+            if matcher and not matcher(path):
+                continue
+            if min_size is not None and (size or 0) < min_size:
+                continue
+            if max_size is not None and (size or 0) > max_size:
+                continue
+            if after is not None and (modified is None or modified < after):
+                continue
+            if before is not None and (modified is None or modified > before):
+                continue
+            yield path, size, modified
+
+
+class SelectionModel:
+    """Ordered download selection with O(1) membership checks.
+
+    Entries are ``bucket/key`` files or ``bucket/prefix/`` folders; a folder
+    is expanded into files only when the download runs. An entry already
+    covered by a selected folder is never added twice.
+    """
+
+    def __init__(self):
+        self.rows = []
+        self.members = set()
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __getitem__(self, index):
+        return self.rows[index]
+
+    def _covered(self, path):
+        # ตรวจเฉพาะโฟลเดอร์แม่ของ path นี้ จึงใช้เวลาตามความลึก ไม่ใช่จำนวนที่เลือก
+        position = path.find('/')
+        while 0 <= position < len(path) - 1:
+            if path[:position + 1] in self.members:
+                return True
+            position = path.find('/', position + 1)
+        return path in self.members
+
+    def add(self, path):
+        if self._covered(path):
+            return False
+        if path.endswith('/'):
+            # โฟลเดอร์ใหม่ครอบคลุมรายการเดิมที่อยู่ข้างใน
+            if any(row.startswith(path) for row in self.members):
+                self.rows = [row for row in self.rows if not row.startswith(path)]
+                self.members = set(self.rows)
+        self.rows.append(path)
+        self.members.add(path)
+        return True
+
+    def remove_at(self, index):
+        self.members.discard(self.rows.pop(index))
+
+    def clear(self):
+        self.rows.clear()
+        self.members.clear()
+
+    def files(self):
+        return [row for row in self.rows if not row.endswith('/')]
+
+    def prefixes(self):
+        return [row for row in self.rows if row.endswith('/')]
+
+
+class SelectionView:
+    """Virtualized Listbox over a SelectionModel.
+
+    Only the rows that fit in the widget are inserted into Tk; the scrollbar
+    and mouse wheel move a window over the model instead.
+    """
+
+    def __init__(self, listbox, scrollbar, model):
+        self.listbox = listbox
+        self.scrollbar = scrollbar
+        self.model = model
+        self.top = 0
+        self.scrollbar.configure(command=self.yview)
+        self.listbox.bind('<Configure>', lambda event: self.refresh())
+        self.listbox.bind('<MouseWheel>', lambda event: self.yview('scroll', -1 if event.delta > 0 else 1, 'units'))
+        self.listbox.bind('<Button-4>', lambda event: self.yview('scroll', -1, 'units'))
+        self.listbox.bind('<Button-5>', lambda event: self.yview('scroll', 1, 'units'))
+
+    def visible_rows(self):
+        line_height = tkfont.nametofont(self.listbox.cget('font')).metrics('linespace') + 1
+        return max(1, self.listbox.winfo_height() // line_height)
+
+    def yview(self, *args):
+        visible = self.visible_rows()
+        if args[0] == 'moveto':
+            self.top = int(float(args[1]) * len(self.model))
+        elif args[0] == 'scroll':
+            step = visible if args[2] == 'pages' else 1
+            self.top += int(args[1]) * step
+        self.refresh()
+
+    def refresh(self):
+        visible = self.visible_rows()
+        total = len(self.model)
+        self.top = max(0, min(self.top, total - visible))
+        self.listbox.delete(0, tk.END)
+        for row in self.model.rows[self.top:self.top + visible]:
+            self.listbox.insert(tk.END, row)
+        if total:
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + visible) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def selected_index(self):
+        selection = self.listbox.curselection()
+        return self.top + selection[0] if selection else None
+
+
+class ListingCache:
+    """Per-endpoint SQLite cache of bucket and prefix listings.
+
+    Lets a reconnect draw the last known tree immediately while the listing
+    is revalidated in the background.
+    """
+
+    def __init__(self, path, endpoint):
+        self.endpoint = endpoint
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS prefixes ("
+                " endpoint TEXT, bucket TEXT, prefix TEXT, fetched_at REAL, complete INTEGER,"
+                " PRIMARY KEY (endpoint, bucket, prefix))"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " endpoint TEXT, bucket TEXT, prefix TEXT, key TEXT, is_dir INTEGER,"
+                " size INTEGER, etag TEXT, last_modified TEXT,"
+                " PRIMARY KEY (endpoint, bucket, prefix, key))"
+            )
+
+    def get(self, bucket_name, prefix):
+        """Return ``(fetched_at, complete, entries)`` for a listing, or None if it was never cached.
+
+        The bucket list itself is stored under bucket ``''``.
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT fetched_at, complete FROM prefixes WHERE endpoint = ? AND bucket = ? AND prefix = ?",
+                (self.endpoint, bucket_name, prefix)
+            ).fetchone()
+            if row is None:
+                return None
+            entries = self.conn.execute(
+                "SELECT key, is_dir, size, etag, last_modified FROM entries"
+                " WHERE endpoint = ? AND bucket = ? AND prefix = ? ORDER BY key",
+                (self.endpoint, bucket_name, prefix)
+            ).fetchall()
+        return row[0], bool(row[1]), [(key, bool(is_dir), size, etag, last_modified)
+                                      for key, is_dir, size, etag, last_modified in entries]
+
+    def put(self, bucket_name, prefix, entries, upto=None):
+        """Store the first page of a listing.
+
+        Cached keys up to and including ``upto`` are replaced by ``entries``;
+        with ``upto=None`` the page was the whole listing and replaces it all.
+        """
+        with self.lock, self.conn:
+            if upto is None:
+                self.conn.execute(
+                    "DELETE FROM entries WHERE endpoint = ? AND bucket = ? AND prefix = ?",
+                    (self.endpoint, bucket_name, prefix)
+                )
+            else:
+                self.conn.execute(
+                    "DELETE FROM entries WHERE endpoint = ? AND bucket = ? AND prefix = ? AND key <= ?",
+                    (self.endpoint, bucket_name, prefix, upto)
+                )
+            self._insert(bucket_name, prefix, entries, upto is None)
+
+    def append(self, bucket_name, prefix, entries, complete):
+        """Add a later page of a listing."""
+        with self.lock, self.conn:
+            self._insert(bucket_name, prefix, entries, complete)
+
+    def _insert(self, bucket_name, prefix, entries, complete):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(self.endpoint, bucket_name, prefix, key, int(is_dir), size, etag, last_modified)
+             for key, is_dir, size, etag, last_modified in entries]
+        )
+        self.conn.execute(
+            "INSERT OR REPLACE INTO prefixes VALUES (?, ?, ?, ?, ?)",
+            (self.endpoint, bucket_name, prefix, time.time(), int(complete))
+        )
+
+    def invalidate(self, bucket_name, prefix):
+        # ลบทั้ง prefix นี้และ prefix ย่อยทั้งหมด
+        query = "WHERE endpoint = ? AND bucket = ? AND prefix >= ?"
+        params = (self.endpoint, bucket_name, prefix)
+        end = prefix_end(prefix)
+        if end is not None:
+            query += " AND prefix < ?"
+            params += (end,)
+        with self.lock, self.conn:
+            for table in ("prefixes", "entries"):
+                self.conn.execute(f"DELETE FROM {table} {query}", params)
+
 
 class FileManagerApp:
     def __init__(self, root):
@@ -47,15 +487,67 @@ class FileManagerApp:
       self.disconnect_button = ttk.Button(input_frame, text="Disconnect", command=self.disconnect_from_minio, state=tk.DISABLED)
       self.disconnect_button.grid(row=0, column=7, padx=10)
 
+      self.lazy_listing = tk.BooleanVar(value=True)
+      self.lazy_listing_check = ttk.Checkbutton(input_frame, text="Lazy browsing", variable=self.lazy_listing)
+      self.lazy_listing_check.grid(row=0, column=8, padx=10)
+
+      self.cache_ttl_label = ttk.Label(input_frame, text="Cache TTL (s):")
+      self.cache_ttl_label.grid(row=0, column=9, sticky=tk.W, padx=5)
+      self.cache_ttl = tk.IntVar(value=CACHE_TTL)
+      self.cache_ttl_spinbox = ttk.Spinbox(input_frame, from_=0, to=86400, increment=60, width=6, textvariable=self.cache_ttl)
+      self.cache_ttl_spinbox.grid(row=0, column=10, padx=5)
+
       self.endpoint_entry.bind("<KeyRelease>", self.check_inputs)
       self.access_key_entry.bind("<KeyRelease>", self.check_inputs)
       self.secret_key_entry.bind("<KeyRelease>", self.check_inputs)
 
+      search_frame = tk.Frame(root, bg="#323232")
+      search_frame.pack(padx=20, fill=tk.X)
+
+      self.search_label = ttk.Label(search_frame, text="Search:")
+      self.search_label.grid(row=0, column=0, sticky=tk.W, padx=5)
+      self.search_entry = ttk.Entry(search_frame, width=40)
+      self.search_entry.grid(row=0, column=1, padx=5)
+      self.search_mode = tk.StringVar(value="prefix")
+      self.search_mode_box = ttk.Combobox(search_frame, textvariable=self.search_mode, values=("prefix", "glob", "regex"),
+                                          state="readonly", width=7)
+      self.search_mode_box.grid(row=0, column=2, padx=5)
+
+      self.search_size_label = ttk.Label(search_frame, text="Size MB (min/max):")
+      self.search_size_label.grid(row=0, column=3, sticky=tk.W, padx=5)
+      self.search_min_size = ttk.Entry(search_frame, width=7)
+      self.search_min_size.grid(row=0, column=4)
+      self.search_max_size = ttk.Entry(search_frame, width=7)
+      self.search_max_size.grid(row=0, column=5, padx=5)
+
+      self.search_date_label = ttk.Label(search_frame, text="Modified (YYYY-MM-DD from/to):")
+      self.search_date_label.grid(row=0, column=6, sticky=tk.W, padx=5)
+      self.search_after = ttk.Entry(search_frame, width=11)
+      self.search_after.grid(row=0, column=7)
+      self.search_before = ttk.Entry(search_frame, width=11)
+      self.search_before.grid(row=0, column=8, padx=5)
+
+      self.search_add_button = ttk.Button(search_frame, text="Add Matches", command=self.add_search_matches, state=tk.DISABLED)
+      self.search_add_button.grid(row=0, column=9, padx=10)
+      self.search_status = ttk.Label(search_frame, text="")
+      self.search_status.grid(row=0, column=10, sticky=tk.W)
+
+      for entry in (self.search_entry, self.search_min_size, self.search_max_size, self.search_after, self.search_before):
+          entry.bind("<KeyRelease>", self.schedule_search)
+      self.search_mode_box.bind("<<ComboboxSelected>>", self.schedule_search)
+      self.object_index = ObjectIndex()
+      # โหมด lazy: index มีเฉพาะโฟลเดอร์ที่เปิดแล้ว จึง list ทุก bucket แบบ recursive เบื้องหลังเมื่อค้นหาครั้งแรก
+      # None = ยังไม่เริ่ม, 'running' หรือ 'done'
+      self.index_state = None
+      self.search_pending = None
+      self.search_generation = 0
+
       self.tree_frame = tk.Frame(root, bg="#323232")
       self.tree_frame.pack(padx=20, pady=10, fill=tk.BOTH, expand=True)
 
       self.tree = ttk.Treeview(self.tree_frame)
       self.tree.heading('#0', text='Buckets and Files', anchor='w')
+      self.tree_model = TreeModel(self.tree)
 
       self.scrollbar = ttk.Scrollbar(self.tree_frame, orient="vertical", command=self.tree.yview)
       self.tree.configure(yscroll=self.scrollbar.set)
@@ -77,26 +569,63 @@ class FileManagerApp:
 
       self.output_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
       self.output_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+      self.output_tree.bind("<<TreeviewOpen>>", self.on_output_tree_open)
+
+      # path ของโฟลเดอร์ output เทียบกับ self.output_folder -> node
+      self.output_model = TreeModel(self.output_tree)
+      # โฟลเดอร์ที่โหลดแล้ว -> mtime ตอนอ่านล่าสุด ใช้ตัดสินว่าต้องอ่านใหม่หรือไม่
+      self.output_scanned = {}
+      self.output_queue = queue.Queue()
+      self.output_generation = 0
+      self.output_lock = threading.Lock()
+      self.output_dirty = set()
+      self.output_last_refresh = 0.0
 
       main_frame = tk.Frame(root, bg="#323232")
       main_frame.pack(padx=20, pady=10, fill=tk.BOTH, expand=True)
 
+      self.search_results_frame = tk.Frame(main_frame, bg="#323232")
+      self.search_results_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5)
+
+      self.search_results_label = ttk.Label(self.search_results_frame, text="Search Results:")
+      self.search_results_label.pack(anchor='nw')
+
+      self.search_scrollbar = ttk.Scrollbar(self.search_results_frame, orient="vertical")
+      self.search_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+      self.search_listbox = tk.Listbox(self.search_results_frame)
+      self.search_listbox.pack(fill=tk.BOTH, expand=True)
+      self.search_results = SelectionModel()
+      self.search_view = SelectionView(self.search_listbox, self.search_scrollbar, self.search_results)
+
       self.preview_frame = tk.Frame(main_frame, bg="#323232")
       self.preview_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5)
 
       self.preview_label = ttk.Label(self.preview_frame, text="Selected Files:")
       self.preview_label.pack(anchor='nw')
 
+      self.preview_scrollbar = ttk.Scrollbar(self.preview_frame, orient="vertical")
+      self.preview_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
       self.preview_listbox = tk.Listbox(self.preview_frame)
       self.preview_listbox.pack(fill=tk.BOTH, expand=True)
       self.preview_listbox.bind('<<ListboxSelect>>', self.check_download_button_state)
+      self.selection = SelectionModel()
+      self.selection_view = SelectionView(self.preview_listbox, self.preview_scrollbar, self.selection)
 
       self.progress_frame = tk.Frame(main_frame, bg="#323232")
       self.progress_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5)
 
-      self.progress_label = ttk.Label(self.progress_frame, text="Download Progress:")
+      self.progress_label = ttk.Label(self.progress_frame, text="Transfer Progress:")
       self.progress_label.pack(anchor='nw')
 
+      self.progress_summary = ttk.Label(self.progress_frame, text="")
+      self.progress_summary.pack(anchor='nw')
+
+      self.progress_bar = ttk.Progressbar(self.progress_frame, mode='determinate', maximum=100)
+      self.progress_bar.pack(fill=tk.X)
+
+      self.active_text = tk.Text(self.progress_frame, height=PROGRESS_ACTIVE_ROWS + 1, wrap='none')
+      self.active_text.pack(fill=tk.X, pady=5)
+
       self.progress_text = tk.Text(self.progress_frame, height=10, wrap='none')
       self.progress_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
@@ -122,12 +651,132 @@ class FileManagerApp:
       self.refresh_output_button = ttk.Button(button_frame, text="Refresh Output Folders", command=self.refresh_output_folders)
       self.refresh_output_button.pack(side=tk.LEFT, padx=10)
 
+      self.upload_workers_label = ttk.Label(button_frame, text="Upload workers:")
+      self.upload_workers_label.pack(side=tk.LEFT, padx=(10, 0))
+      self.upload_workers = tk.IntVar(value=UPLOAD_WORKERS)
+      self.upload_workers_spinbox = ttk.Spinbox(button_frame, from_=1, to=64, width=4, textvariable=self.upload_workers)
+      self.upload_workers_spinbox.pack(side=tk.LEFT, padx=5)
+
+      # ไฟล์ที่เล็กกว่าค่านี้ (KB) จะถูกรวมเป็น tar ก่อนอัปโหลด; 0 = ปิด
+      self.snowball_threshold_label = ttk.Label(button_frame, text="Batch files < KB:")
+      self.snowball_threshold_label.pack(side=tk.LEFT, padx=(10, 0))
+      self.snowball_threshold = tk.IntVar(value=0)
+      self.snowball_threshold_spinbox = ttk.Spinbox(button_frame, from_=0, to=102400, increment=256, width=6,
+                                                    textvariable=self.snowball_threshold)
+      self.snowball_threshold_spinbox.pack(side=tk.LEFT, padx=5)
+      self.snowball_batch_label = ttk.Label(button_frame, text="Batch MB:")
+      self.snowball_batch_label.pack(side=tk.LEFT)
+      self.snowball_batch = tk.IntVar(value=SNOWBALL_BATCH_SIZE // (1024 * 1024))
+      self.snowball_batch_spinbox = ttk.Spinbox(button_frame, from_=1, to=1024, width=5, textvariable=self.snowball_batch)
+      self.snowball_batch_spinbox.pack(side=tk.LEFT, padx=5)
+
+      self.compression_label = ttk.Label(button_frame, text="Compress:")
+      self.compression_label.pack(side=tk.LEFT, padx=(10, 0))
+      self.compression = tk.StringVar(value="off")
+      self.compression_box = ttk.Combobox(button_frame, textvariable=self.compression, values=["off"] + available_codecs(),
+                                          state="readonly", width=5)
+      self.compression_box.pack(side=tk.LEFT, padx=5)
+
+      self.sync_mode = tk.BooleanVar(value=False)
+      self.sync_check = ttk.Checkbutton(button_frame, text="Sync (skip unchanged)", variable=self.sync_mode)
+      self.sync_check.pack(side=tk.LEFT, padx=5)
+      # ลบข้อมูลได้ จึงปิดไว้ทุกครั้งที่เปิดโปรแกรมและไม่บันทึกลง config
+      self.mirror_delete = tk.BooleanVar(value=False)
+      self.mirror_delete_check = ttk.Checkbutton(button_frame, text="Mirror delete", variable=self.mirror_delete)
+      self.mirror_delete_check.pack(side=tk.LEFT, padx=5)
+
+      self.listing_status = ttk.Label(button_frame, text="")
+      self.listing_status.pack(side=tk.RIGHT, padx=10)
+
+      # คิวดาวน์โหลด: แต่ละครั้งที่กด Download จะเป็นหนึ่งงานในคิว
+      queue_frame = tk.Frame(root, bg="#323232")
+      queue_frame.pack(padx=20, pady=(0, 10), fill=tk.X)
+      self.queue_tree = ttk.Treeview(queue_frame, columns=("state", "files", "priority", "limit"), height=4)
+      self.queue_tree.heading("#0", text="Download queue")
+      self.queue_tree.heading("state", text="State")
+      self.queue_tree.heading("files", text="Files")
+      self.queue_tree.heading("priority", text="Priority")
+      self.queue_tree.heading("limit", text="MB/s")
+      for column in ("state", "files", "priority", "limit"):
+          self.queue_tree.column(column, width=90, anchor='center')
+      self.queue_tree.pack(side=tk.LEFT, fill=tk.X, expand=True)
+
+      queue_buttons = tk.Frame(queue_frame, bg="#323232")
+      queue_buttons.pack(side=tk.LEFT, padx=10)
+      self.priority_label = ttk.Label(queue_buttons, text="Priority:")
+      self.priority_label.grid(row=0, column=0, sticky='w')
+      self.priority = tk.IntVar(value=0)
+      self.priority_spinbox = ttk.Spinbox(queue_buttons, from_=-10, to=10, width=4, textvariable=self.priority)
+      self.priority_spinbox.grid(row=0, column=1, padx=5)
+      # ค่าจำกัดแบนด์วิดท์ (MB/s; 0 = ไม่จำกัด) ของทั้งแอป และของงานใหม่/งานที่เลือก
+      self.bandwidth_label = ttk.Label(queue_buttons, text="Limit MB/s:")
+      self.bandwidth_label.grid(row=1, column=0, sticky='w')
+      self.bandwidth_limit = tk.DoubleVar(value=0)
+      self.bandwidth_spinbox = ttk.Spinbox(queue_buttons, from_=0, to=10000, increment=1, width=6,
+                                           textvariable=self.bandwidth_limit, command=self.apply_bandwidth_limit)
+      self.bandwidth_spinbox.grid(row=1, column=1, padx=5)
+      self.bandwidth_spinbox.bind("<Return>", self.apply_bandwidth_limit)
+      self.job_limit_label = ttk.Label(queue_buttons, text="Job MB/s:")
+      self.job_limit_label.grid(row=2, column=0, sticky='w')
+      self.job_limit = tk.DoubleVar(value=0)
+      self.job_limit_spinbox = ttk.Spinbox(queue_buttons, from_=0, to=10000, increment=1, width=6,
+                                           textvariable=self.job_limit)
+      self.job_limit_spinbox.grid(row=2, column=1, padx=5)
+
+      for index, (text, command) in enumerate((
+          ("Pause", self.pause_job), ("Resume", self.resume_job), ("Cancel", self.cancel_job),
+          ("Priority +", lambda: self.change_job_priority(1)), ("Priority -", lambda: self.change_job_priority(-1)),
+          ("Set Job Limit", self.set_job_limit), ("Clear Finished", self.clear_finished_jobs),
+      )):
+          ttk.Button(queue_buttons, text=text, command=command).grid(row=index % 3, column=2 + index // 3, padx=5, pady=2, sticky='ew')
+
       self.menu = Menu(self.tree, tearoff=0)
       self.menu.add_command(label="Select", command=self.select_file)
       self.menu.add_command(label="Upload", command=self.upload_to_folder)
+      self.menu.add_command(label="Invalidate Cache", command=self.invalidate_cache)
+      self.menu.add_separator()
+      self.menu.add_command(label="Copy to...", command=lambda: self.copy_selected(move=False))
+      self.menu.add_command(label="Move to...", command=lambda: self.copy_selected(move=True))
+      self.menu.add_command(label="Rename...", command=self.rename_selected)
       self.tree.bind("<Button-3>", self.show_context_menu)
       self.tree.bind("<Control-Button-1>", self.show_context_menu)
       self.tree.bind("<Button-2>", self.show_context_menu)
+      self.tree.bind("<<TreeviewOpen>>", self.on_tree_open)
+      self.tree.bind("<Double-1>", self.on_tree_double_click)
+
+      # node ของ "Load more..." -> generator ของ list_objects ที่ยังอ่านไม่หมด
+      self.pending_listings = {}
+
+      # การ list object ทำใน worker thread แล้วส่งผลลัพธ์ผ่านคิวนี้
+      self.listing_queue = queue.Queue()
+      self.listing_cancel = threading.Event()
+      self.listing_generation = 0
+      self.listing_active = 0
+      self.listing_count = 0
+      self.root.after(LISTING_POLL_MS, self._drain_listing_queue)
+      self.root.after(LISTING_POLL_MS, self._drain_output_queue)
+
+      self.manifest = None
+      self.listing_cache = None
+
+      self.progress = TransferProgress()
+      self.scheduler = TransferScheduler()
+      self.root.after(PROGRESS_TICK_MS, self._progress_tick)
+
+      self.transfer_queue = None
+      self.queue_runner = None
+      self.root.after(QUEUE_REFRESH_MS, self._refresh_queue_view)
+
+      # trace log, ไฟล์/endpoint ของ metrics และ profiler เปิดผ่าน environment variable (ดู README)
+      try:
+          self.instrumentation = Instrumentation.from_env()
+      except Exception as e:
+          # port ถูกใช้อยู่หรือเขียน log ไม่ได้ ไม่ควรทำให้เปิดโปรแกรมไม่ได้
+          self.instrumentation = None
+          print(f"Error: Failed to start instrumentation: {str(e)}")
+          self._update_progress(f"Instrumentation disabled: {str(e)}\n")
+      registry.collectors.append(self._collect_metrics)
+      self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
       self.preview_menu = Menu(self.preview_listbox, tearoff=0)
       self.preview_menu.add_command(label="Delete", command=self.delete_selected_file)
@@ -151,70 +800,40 @@ class FileManagerApp:
         if not folder_to_upload:
             return
 
+        base_folder_name = os.path.basename(folder_to_upload)
+        folder_only = f"{'/'.join(folder_path.split('/')[1:])}/{base_folder_name}".rstrip('/')
+        # progress ใช้ร่วมกับคิวดาวน์โหลด จึงเริ่มนับใหม่เฉพาะเมื่อไม่มีงานอื่นค้างอยู่
+        self.progress.reset(if_idle=True)
+        threading.Thread(
+            target=self._upload_folder_thread,
+            args=(folder_path.split('/')[0], folder_to_upload, folder_only, self.upload_workers.get(),
+                  self.sync_mode.get(), self.mirror_delete.get(),
+                  self.snowball_threshold.get() * 1024, self.snowball_batch.get() * 1024 * 1024,
+                  None if self.compression.get() == "off" else self.compression.get()),
+            daemon=True
+        ).start()
+
+    def _upload_folder_thread(self, bucket_name, folder_to_upload, object_prefix, workers, sync, mirror_delete,
+                              snowball_threshold=0, snowball_batch_size=SNOWBALL_BATCH_SIZE, compression=None):
         try:
-            base_folder_name = os.path.basename(folder_to_upload)
-            folder_only = f"{'/'.join(folder_path.split('/')[1:])}/{base_folder_name}".rstrip('/')
-
-            tasks = []
-
-            # ใช้ ThreadPoolExecutor สำหรับการอัปโหลดแบบมัลติเธรด
-            with ThreadPoolExecutor(max_workers=10) as executor:
-                for root, dirs, files in os.walk(folder_to_upload):
-                    # ตรวจสอบและปรับชื่อโฟลเดอร์
-                    adjusted_dirs = [d.replace('__', ':') for d in dirs]
-                    for original, adjusted in zip(dirs, adjusted_dirs):
-                        if original != adjusted:
-                            os.rename(os.path.join(root, original), os.path.join(root, adjusted))
-                    dirs[:] = adjusted_dirs  # อัปเดตชื่อในโครงสร้าง os.walk
-
-                    for file_name in files:
-                        # ตรวจสอบและปรับชื่อไฟล์
-                        adjusted_file_name = file_name.replace('__', ':')
-                        if file_name != adjusted_file_name:
-                            os.rename(
-                                os.path.join(root, file_name),
-                                os.path.join(root, adjusted_file_name)
-                            )
-                        file_path = os.path.join(root, adjusted_file_name)
-                        relative_path = os.path.relpath(file_path, folder_to_upload)
-                        object_name = f"{folder_only}/{relative_path}".lstrip('/')
-
-                        # สร้าง Task สำหรับการอัปโหลดไฟล์แต่ละไฟล์
-                        tasks.append(
-                            executor.submit(self._upload_single_file, folder_path.split('/')[0], object_name, file_path)
-                        )
-
-                # ประมวลผล Tasks พร้อมกันและจัดการข้อผิดพลาด
-                for future in as_completed(tasks):
-                    try:
-                        result = future.result()
-                        if result:
-                            self._update_progress(result)
-                    except Exception as e:
-                        self._update_progress(f"Error during upload: {str(e)}\n")
-
-            messagebox.showinfo("Upload Success", "All files in the folder were uploaded successfully!")
-            self.load_buckets()
-
+            pipeline = self._engine().upload_folder(
+                bucket_name, folder_to_upload, object_prefix, workers=workers, sync=sync, mirror_delete=mirror_delete,
+                snowball_threshold=snowball_threshold, snowball_batch_size=snowball_batch_size, compression=compression
+            )
+            uploaded, failed = pipeline.uploaded, pipeline.failed
+            if sync:
+                self._update_progress(f"Sync: {uploaded} uploaded, {pipeline.skipped} unchanged, {pipeline.deleted} deleted.\n")
+            if failed:
+                self.root.after(0, lambda: messagebox.showwarning(
+                    "Upload Finished", f"Uploaded {uploaded} files, {failed} failed. See progress log for details."))
+            else:
+                self.root.after(0, lambda: messagebox.showinfo(
+                    "Upload Success", "All files in the folder were uploaded successfully!"))
+            self.root.after(0, self.load_buckets)
         except Exception as e:
             general_error_message = f"Error walking through directory {folder_to_upload}: {str(e)}"
             print(general_error_message)
-            messagebox.showerror("Upload Failed", general_error_message)
-
-    def _upload_single_file(self, bucket_name, object_name, file_path):
-        try:
-            with open(file_path, 'rb') as file_data:
-                self.minio_client.put_object(
-                    bucket_name=bucket_name,
-                    object_name=object_name,
-                    data=file_data,
-                    length=os.path.getsize(file_path)
-                )
-            return f"Uploaded: {object_name}\n"
-        except Exception as e:
-            error_message = f"Error during upload of {object_name}: {str(e)}"
-            print(error_message)
-            return error_message
+            self.root.after(0, lambda: messagebox.showerror("Upload Failed", general_error_message))
 
     def check_inputs(self, event):
         if self.endpoint_entry.get() and self.access_key_entry.get() and self.secret_key_entry.get():
@@ -234,20 +853,21 @@ class FileManagerApp:
         secret_key = self.secret_key_entry.get()
 
         try:
-            http_client = PoolManager(
-                timeout=Timeout(connect=10, read=60),
-                retries=False
-            )
-            self.minio_client = Minio(
-                endpoint,
-                access_key=access_key,
-                secret_key=secret_key,
-                secure=False,
-                # secure=True,
-                http_client=http_client
-            )
+            # scheduler และ connection pool ใช้ร่วมกันทุกการโอนไฟล์ในการเชื่อมต่อนี้
+            self.scheduler = TransferScheduler()
+            self.minio_client = create_client(endpoint, access_key, secret_key, secure=False,
+                                              max_connections=self.scheduler.maximum)
 
             buckets = self.minio_client.list_buckets()
+            self.manifest = SyncManifest(MANIFEST_PATH, endpoint)
+            self.listing_cache = ListingCache(CACHE_PATH, endpoint)
+            # งานที่ค้างในคิวจากครั้งก่อนจะดาวน์โหลดต่อทันที
+            self.transfer_queue = TransferQueue(QUEUE_PATH, endpoint)
+            self.queue_runner = QueueRunner(
+                self.transfer_queue, self.minio_client, manifest=self.manifest, progress=self.progress,
+                on_event=self._on_transfer_event, scheduler=self.scheduler, rate=self._bandwidth_bytes()
+            )
+            self.queue_runner.start()
 
             self.root.after(0, lambda: messagebox.showinfo("Success", "Connected to MinIO Server successfully!"))
             self.root.after(0, lambda: self.save_config(endpoint, access_key, secret_key))
@@ -264,86 +884,520 @@ class FileManagerApp:
         self.refresh_button.config(state=tk.DISABLED)
         self.disconnect_button.config(state=tk.DISABLED)
         self.connect_button.config(state=tk.NORMAL)
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        self.listing_cancel.set()
+        self.listing_generation += 1
+        self.listing_active = 0
+        self.listing_count = 0
+        self._update_listing_status()
+        self.tree_model.clear()
+        self.object_index.clear()
+        self.index_state = None
+        self.pending_listings.clear()
+        if self.queue_runner:
+            self.queue_runner.stop()
+        self.queue_runner = None
+        self.transfer_queue = None
+        self.manifest = None
+        self.listing_cache = None
         messagebox.showinfo("Disconnected", "Disconnected from MinIO Server.")
 
     def load_buckets(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        # ยกเลิกการ list ที่ยังทำงานอยู่ก่อนเริ่มรอบใหม่
+        self.listing_cancel.set()
+        self.listing_cancel = threading.Event()
+        self.listing_generation += 1
+        self.listing_active = 0
+        self.listing_count = 0
+
+        self.tree_model.clear()
+        self.object_index.clear()
+        self.index_state = None
+        self.pending_listings.clear()
+        lazy = self.lazy_listing.get()
+        if lazy and self.listing_cache:
+            cached = self.listing_cache.get('', '')
+            if cached:
+                # แสดงรายชื่อ bucket จาก cache ทันที แล้วค่อยตรวจสอบกับ server
+                self._apply_bucket_names([key for key, *_ in cached[2]], lazy)
+        self._start_listing(self._list_buckets_worker, lazy)
+
+    def _start_listing(self, target, *args):
+        self.listing_active += 1
+        self._update_listing_status()
+        threading.Thread(
+            target=target,
+            args=(self.listing_generation, self.listing_cancel) + args,
+            daemon=True
+        ).start()
+
+    def _list_buckets_worker(self, generation, cancel, lazy):
+        try:
+            buckets = [bucket.name for bucket in self.minio_client.list_buckets()]
+            if self.listing_cache:
+                self.listing_cache.put('', '', [(name, True, None, None, None) for name in buckets])
+            self.listing_queue.put((generation, 'buckets', (buckets, lazy)))
+            if not lazy:
+                for bucket_name in buckets:
+                    if cancel.is_set():
+                        return
+                    batch = []
+                    indexed = []
+                    for obj in timed_listing(self.minio_client.list_objects(bucket_name, recursive=True), bucket_name):
+                        if cancel.is_set():
+                            return
+                        batch.append(obj.object_name)
+                        if not obj.object_name.endswith('/'):
+                            modified = obj.last_modified.timestamp() if obj.last_modified else None
+                            indexed.append((f"{bucket_name}/{obj.object_name}", obj.size, modified))
+                        if len(batch) >= LISTING_BATCH_SIZE:
+                            self.object_index.add(indexed)
+                            self.listing_queue.put((generation, 'objects', (bucket_name, batch)))
+                            batch = []
+                            indexed = []
+                    self.object_index.add(indexed)
+                    self.listing_queue.put((generation, 'objects', (bucket_name, batch)))
+        except Exception as e:
+            self.listing_queue.put((generation, 'error', f"Failed to load buckets: {str(e)}"))
+        finally:
+            self.listing_queue.put((generation, 'done', None))
 
+    def _start_index(self):
+        self.index_state = 'running'
+        self._start_listing(self._index_worker)
+
+    def _index_worker(self, generation, cancel):
         try:
-            buckets = self.minio_client.list_buckets()
-            for bucket in buckets:
-                bucket_node = self.tree.insert('', 'end', text=bucket.name, open=False)
-                self.load_objects(bucket.name, bucket_node)
+            for bucket in self.minio_client.list_buckets():
+                indexed = []
+                for obj in timed_listing(self.minio_client.list_objects(bucket.name, recursive=True), bucket.name):
+                    if cancel.is_set():
+                        return
+                    if obj.object_name.endswith('/'):
+                        continue
+                    modified = obj.last_modified.timestamp() if obj.last_modified else None
+                    indexed.append((f"{bucket.name}/{obj.object_name}", obj.size, modified))
+                    if len(indexed) >= LISTING_BATCH_SIZE:
+                        self.object_index.add(indexed)
+                        indexed = []
+                self.object_index.add(indexed)
+                self.listing_queue.put((generation, 'indexed', bucket.name))
+            self.listing_queue.put((generation, 'indexed', None))
         except Exception as e:
-            print(f"Error: Failed to load buckets: {str(e)}")
-            messagebox.showerror("Error", f"Failed to load buckets: {str(e)}")
+            self.listing_queue.put((generation, 'error', f"Failed to index objects for search: {str(e)}"))
+        finally:
+            self.listing_queue.put((generation, 'done', None))
 
-    def load_objects(self, bucket_name, parent):
+    def _list_prefix_worker(self, generation, cancel, node, bucket_name, prefix, objects, first_page):
+        # minio-py ดึงหน้าถัดไปจาก server เมื่อ generator ถูกอ่านต่อเท่านั้น
+        # จึงเก็บ generator ไว้กับ node "Load more..." แทนการ list ใหม่
         try:
-            objects = self.minio_client.list_objects(bucket_name, recursive=True)
+            page = []
+            batch = []
+            complete = True
             for obj in objects:
-                path_parts = obj.object_name.split('/')
-                current_parent = parent
-                for i, part in enumerate(path_parts):
-                    existing_node = self.find_existing_node(current_parent, part)
-                    if existing_node:
-                        current_parent = existing_node
-                    else:
-                        if i == len(path_parts) - 1:
-                            current_parent = self.tree.insert(current_parent, 'end', text=part, tags=('file',))
-                        else:
-                            current_parent = self.tree.insert(current_parent, 'end', text=part)
+                if cancel.is_set():
+                    return
+                last_modified = obj.last_modified.isoformat() if obj.last_modified else None
+                entry = (obj.object_name[len(prefix):], obj.is_dir, obj.size, obj.etag, last_modified)
+                page.append(entry)
+                batch.append(entry)
+                if len(batch) >= LISTING_BATCH_SIZE:
+                    self.listing_queue.put((generation, 'entries', (node, batch)))
+                    batch = []
+                if len(page) >= LIST_PAGE_SIZE:
+                    complete = False
+                    break
+            self.listing_queue.put((generation, 'entries', (node, batch)))
+
+            # หน้าแรกแทนที่ข้อมูลเดิมใน cache และ node ที่ไม่พบแล้วจะถูกลบออก
+            upto = None if complete else page[-1][0]
+            if self.listing_cache:
+                if first_page:
+                    self.listing_cache.put(bucket_name, prefix, page, upto=upto)
+                else:
+                    self.listing_cache.append(bucket_name, prefix, page, complete)
+            if first_page:
+                self.listing_queue.put((generation, 'prune', (node, {entry[0] for entry in page}, upto)))
+            if not complete:
+                self.listing_queue.put((generation, 'more', (node, bucket_name, prefix, objects)))
         except Exception as e:
-            print(f"Error: Failed to load objects: {str(e)}")
-            messagebox.showerror("Error", f"Failed to load objects: {str(e)}")
+            self.listing_queue.put((generation, 'error', f"Failed to load objects: {str(e)}"))
+        finally:
+            self.listing_queue.put((generation, 'done', None))
+
+    def _drain_listing_queue(self):
+        # ทำงานบน main thread ทีละช่วงเวลาสั้น ๆ เพื่อไม่ให้ UI ค้าง
+        deadline = time.monotonic() + LISTING_DRAIN_BUDGET
+        while time.monotonic() < deadline:
+            try:
+                generation, kind, payload = self.listing_queue.get_nowait()
+            except queue.Empty:
+                break
+            if generation != self.listing_generation:
+                continue
+            started = time.perf_counter()
+            self._apply_listing_message(kind, payload)
+            if kind in ('objects', 'entries'):
+                # เวลาที่ Tk ใช้แทรก node หนึ่ง batch บน main thread
+                seconds = time.perf_counter() - started
+                registry.observe("tree_insert_seconds", seconds, kind=kind)
+                registry.inc("tree_rows", len(payload[1]), kind=kind)
+                registry.trace({"trace": "tree_insert", "kind": kind, "rows": len(payload[1]), "seconds": seconds})
+        self._update_listing_status()
+        self.root.after(LISTING_POLL_MS, self._drain_listing_queue)
+
+    def _apply_listing_message(self, kind, payload):
+        if kind == 'buckets':
+            bucket_names, lazy = payload
+            self._apply_bucket_names(bucket_names, lazy)
+        elif kind == 'objects':
+            bucket_name, object_names = payload
+            self.load_objects(bucket_name, object_names)
+        elif kind == 'entries':
+            node, entries = payload
+            if self.tree.exists(node):
+                self._insert_listing_page(node, entries)
+        elif kind == 'prune':
+            node, keys, upto = payload
+            if self.tree.exists(node):
+                self._prune_listing(node, keys, upto)
+        elif kind == 'more':
+            node, bucket_name, prefix, objects = payload
+            if self.tree.exists(node):
+                more_node = self.tree.insert(node, 'end', text=LOAD_MORE_TEXT, tags=('more',))
+                self.pending_listings[more_node] = (bucket_name, prefix, objects)
+        elif kind == 'indexed':
+            if payload is None:
+                self.index_state = 'done'
+            # ค้นหาซ้ำเมื่อ index ครบแต่ละ bucket เพื่อให้ผลลัพธ์ครอบคลุมมากขึ้นเรื่อย ๆ
+            self.schedule_search()
+        elif kind == 'error':
+            print(f"Error: {payload}")
+            messagebox.showerror("Error", payload)
+        elif kind == 'done':
+            self.listing_active -= 1
+
+    def _apply_bucket_names(self, bucket_names, lazy):
+        names = set(bucket_names)
+        for node in self.tree.get_children(''):
+            if self.tree_model.path(node) not in names:
+                self.tree_model.remove(node)
+        for bucket_name in bucket_names:
+            if self.tree_model.node(bucket_name):
+                continue
+            bucket_node = self.tree_model.insert('', bucket_name, open=False)
+            if lazy:
+                # โหลดเฉพาะเมื่อผู้ใช้ขยาย bucket
+                self._add_placeholder(bucket_node)
+
+    def _update_listing_status(self):
+        if self.listing_active > 0:
+            self.listing_status.config(text=f"Listing... {self.listing_count} objects loaded")
+        elif self.listing_count:
+            self.listing_status.config(text=f"{self.listing_count} objects loaded")
+        else:
+            self.listing_status.config(text="")
 
-    def find_existing_node(self, parent, text):
-        for child in self.tree.get_children(parent):
-            if self.tree.item(child, 'text') == text:
-                return child
-        return None
+    def load_objects(self, bucket_name, object_names):
+        for object_name in object_names:
+            if object_name.endswith('/'):
+                # folder marker object
+                self.tree_model.ensure_path(f"{bucket_name}/{object_name.rstrip('/')}")
+            else:
+                self.tree_model.ensure_path(f"{bucket_name}/{object_name}", is_file=True)
+        self.listing_count += len(object_names)
+
+    def _add_placeholder(self, node):
+        self.tree.insert(node, 'end', text=PLACEHOLDER_TEXT, tags=('placeholder',))
+
+    def _split_node_path(self, node):
+        full_path = self.get_full_path(node)
+        bucket_name, _, prefix = full_path.partition('/')
+        if prefix:
+            prefix = f"{prefix}/"
+        return bucket_name, prefix
+
+    def on_tree_open(self, event):
+        node = self.tree.focus()
+        children = self.tree.get_children(node)
+        if len(children) == 1 and 'placeholder' in self.tree.item(children[0], 'tags'):
+            self.tree.delete(children[0])
+            self.load_prefix(node)
+
+    def on_tree_double_click(self, event):
+        node = self.tree.identify_row(event.y)
+        if node and 'more' in self.tree.item(node, 'tags'):
+            self.load_more(node)
+
+    def load_prefix(self, node):
+        bucket_name, prefix = self._split_node_path(node)
+        if self.listing_cache:
+            cached = self.listing_cache.get(bucket_name, prefix)
+            if cached:
+                fetched_at, complete, entries = cached
+                self._insert_listing_page(node, entries)
+                if time.time() - fetched_at < self.cache_ttl.get():
+                    if not complete and entries:
+                        # cache มีเพียงบางหน้า จึงให้ "Load more..." list ต่อจาก key สุดท้าย
+                        objects = timed_listing(self.minio_client.list_objects(
+                            bucket_name, prefix=prefix, recursive=False, start_after=prefix + entries[-1][0]),
+                            bucket_name, prefix)
+                        more_node = self.tree.insert(node, 'end', text=LOAD_MORE_TEXT, tags=('more',))
+                        self.pending_listings[more_node] = (bucket_name, prefix, objects)
+                    return
+        # ใช้ delimiter '/' (recursive=False) เพื่อดึงทีละระดับ
+        objects = timed_listing(self.minio_client.list_objects(bucket_name, prefix=prefix, recursive=False),
+                                bucket_name, prefix)
+        self._start_listing(self._list_prefix_worker, node, bucket_name, prefix, objects, True)
+
+    def load_more(self, more_node):
+        parent = self.tree.parent(more_node)
+        bucket_name, prefix, objects = self.pending_listings.pop(more_node)
+        self.tree.delete(more_node)
+        self._start_listing(self._list_prefix_worker, parent, bucket_name, prefix, objects, False)
+
+    def _insert_listing_page(self, node, entries):
+        base_path = self.tree_model.path(node)
+        self.object_index.add(
+            (f"{base_path}/{key}", size, datetime.fromisoformat(last_modified).timestamp() if last_modified else None)
+            for key, is_dir, size, _, last_modified in entries if not is_dir
+        )
+        for key, is_dir, *_ in entries:
+            name = key.rstrip('/')
+            if self.tree_model.node(f"{base_path}/{name}"):
+                continue
+            if is_dir:
+                folder_node = self.tree_model.insert(node, name, open=False)
+                self._add_placeholder(folder_node)
+            else:
+                self.tree_model.insert(node, name, is_file=True)
+        self.listing_count += len(entries)
+
+    def _prune_listing(self, node, keys, upto):
+        # ลบ node ที่อยู่ในช่วงที่เพิ่ง list ใหม่ แต่ไม่มีอยู่บน server แล้ว
+        for child_path in list(self.tree_model.children.get(self.tree_model.path(node), ())):
+            name = child_path.rsplit('/', 1)[-1]
+            key = name if child_path in self.tree_model.files else f"{name}/"
+            if key not in keys and (upto is None or key <= upto):
+                if child_path in self.tree_model.files:
+                    self.object_index.discard(child_path)
+                else:
+                    self.object_index.discard_prefix(f"{child_path}/")
+                self.tree_model.remove(self.tree_model.node(child_path))
+
+    def invalidate_cache(self):
+        node = self.tree.selection()[0]
+        bucket_name, prefix = self._split_node_path(node)
+        if self.listing_cache:
+            self.listing_cache.invalidate(bucket_name, prefix)
+        self.object_index.discard_prefix(f"{bucket_name}/{prefix}")
+        for child in self.tree.get_children(node):
+            if child in self.pending_listings:
+                del self.pending_listings[child]
+            if self.tree_model.path(child) is not None:
+                self.tree_model.remove(child)
+            else:
+                self.tree.delete(child)
+        if self.tree.item(node, 'open'):
+            self.load_prefix(node)
+        else:
+            self._add_placeholder(node)
+
+    def schedule_search(self, event=None):
+        # รอให้พิมพ์เสร็จก่อนจึงค้นหา
+        if self.search_pending:
+            self.root.after_cancel(self.search_pending)
+        self.search_pending = self.root.after(SEARCH_DEBOUNCE_MS, self.run_search)
+
+    def _search_query(self):
+        def megabytes(entry):
+            text = entry.get().strip()
+            return int(float(text) * 1024 * 1024) if text else None
+
+        def timestamp(entry, end_of_day=False):
+            text = entry.get().strip()
+            if not text:
+                return None
+            start = datetime.strptime(text, "%Y-%m-%d").timestamp()
+            return start + 86399.999 if end_of_day else start
+
+        filters = {
+            "min_size": megabytes(self.search_min_size),
+            "max_size": megabytes(self.search_max_size),
+            "after": timestamp(self.search_after),
+            "before": timestamp(self.search_before, end_of_day=True)
+        }
+        pattern = self.search_entry.get()
+        if not pattern and all(value is None for value in filters.values()):
+            return None
+        return self.object_index.search(pattern, self.search_mode.get(), **filters)
+
+    def run_search(self):
+        self.search_pending = None
+        self.search_generation += 1
+        self.search_results.clear()
+        self.search_view.refresh()
+        self.search_add_button.config(state=tk.DISABLED)
+        try:
+            results = self._search_query()
+        except (ValueError, re.error) as e:
+            self.search_status.config(text=f"Invalid search: {str(e)}")
+            return
+        if results is None:
+            self.search_status.config(text="")
+            return
+        if self.lazy_listing.get() and self.index_state is None and self.minio_client:
+            self._start_index()
+        self._drain_search(self.search_generation, results)
+
+    def _drain_search(self, generation, results):
+        # แสดงผลทีละช่วงเวลาสั้น ๆ และหยุดทันทีเมื่อมีการค้นหาใหม่
+        if generation != self.search_generation:
+            return
+        deadline = time.monotonic() + LISTING_DRAIN_BUDGET
+        finished = True
+        for path, _, _ in results:
+            self.search_results.add(path)
+            if time.monotonic() >= deadline:
+                finished = False
+                break
+        self.search_view.refresh()
+        count = len(self.search_results)
+        status = f"{count} matches in {len(self.object_index)} listed objects" + ("" if finished else "...")
+        if self.index_state == 'running':
+            status += " (still indexing buckets, results are partial)"
+        elif self.lazy_listing.get() and self.index_state is None:
+            status += " (loaded folders only)"
+        self.search_status.config(text=status)
+        self.search_add_button.config(state=tk.NORMAL if count else tk.DISABLED)
+        if not finished:
+            self.root.after(1, self._drain_search, generation, results)
+
+    def add_search_matches(self):
+        # ค้นหาใหม่ทั้งหมด เพื่อให้ได้ผลลัพธ์ครบแม้ผลบนหน้าจอยังแสดงไม่เสร็จ
+        try:
+            results = self._search_query()
+        except (ValueError, re.error):
+            return
+        if results is None:
+            return
+        for path, _, _ in results:
+            self.selection.add(path)
+        self.selection_view.refresh()
+        self.check_download_button_state()
 
     def show_context_menu(self, event):
         selected_item = self.tree.identify_row(event.y)
         if selected_item:
             self.tree.selection_set(selected_item)
+            if {'placeholder', 'more'} & set(self.tree.item(selected_item, 'tags')):
+                return
             
             # ตรวจสอบว่าเป็นโฟลเดอร์หรือไม่
             if 'file' not in self.tree.item(selected_item, 'tags'):
                 self.menu.entryconfig("Upload", state=tk.NORMAL)
+                self.menu.entryconfig("Invalidate Cache", state=tk.NORMAL if self.listing_cache else tk.DISABLED)
             else:
                 self.menu.entryconfig("Upload", state=tk.DISABLED)
+                self.menu.entryconfig("Invalidate Cache", state=tk.DISABLED)
+            # bucket ทั้ง bucket คัดลอกได้ แต่ย้ายหรือเปลี่ยนชื่อไม่ได้
+            is_bucket = not self.tree.parent(selected_item)
+            self.menu.entryconfig("Move to...", state=tk.DISABLED if is_bucket else tk.NORMAL)
+            self.menu.entryconfig("Rename...", state=tk.DISABLED if is_bucket else tk.NORMAL)
             
             self.menu.tk_popup(event.x_root, event.y_root)
 
+    def _node_source(self, node):
+        if 'file' in self.tree.item(node, 'tags'):
+            bucket_name, _, object_name = self.get_full_path(node).partition('/')
+            return bucket_name, object_name
+        return self._split_node_path(node)
+
+    def copy_selected(self, move=False):
+        node = self.tree.selection()[0]
+        src_bucket, src_key = self._node_source(node)
+        action = "Move" if move else "Copy"
+        destination = simpledialog.askstring(
+            f"{action} to", f"{action} '{self.get_full_path(node)}' into (bucket/folder):", parent=self.root)
+        if not destination or not destination.strip('/'):
+            return
+        dst_bucket, _, dst_folder = destination.strip('/').partition('/')
+        if src_key:
+            # คัดลอกไปไว้ใต้ปลายทางโดยคงชื่อเดิม เหมือนการอัปโหลดโฟลเดอร์
+            name = src_key.rstrip('/').rpartition('/')[2]
+            dst_key = f"{dst_folder}/{name}".lstrip('/') + ('/' if src_key.endswith('/') else '')
+        else:
+            dst_key = f"{dst_folder}/" if dst_folder else ''
+        self._start_copy(src_bucket, src_key, dst_bucket, dst_key, move)
+
+    def rename_selected(self):
+        node = self.tree.selection()[0]
+        src_bucket, src_key = self._node_source(node)
+        parent, _, old_name = src_key.rstrip('/').rpartition('/')
+        new_name = simpledialog.askstring("Rename", "New name:", initialvalue=old_name, parent=self.root)
+        if not new_name or new_name == old_name:
+            return
+        if '/' in new_name:
+            messagebox.showerror("Error", "The new name must not contain '/'.")
+            return
+        dst_key = f"{parent}/{new_name}".lstrip('/') + ('/' if src_key.endswith('/') else '')
+        self._start_copy(src_bucket, src_key, src_bucket, dst_key, move=True)
+
+    def _start_copy(self, src_bucket, src_key, dst_bucket, dst_key, move):
+        self.progress.reset(if_idle=True)
+        threading.Thread(
+            target=self._copy_thread,
+            args=(src_bucket, src_key, dst_bucket, dst_key, move),
+            daemon=True
+        ).start()
+
+    def _copy_thread(self, src_bucket, src_key, dst_bucket, dst_key, move):
+        action = "Move" if move else "Copy"
+        try:
+            counts = self._engine().copy(src_bucket, src_key, dst_bucket, dst_key, move=move)
+        except Exception as e:
+            error_message = f"{action} failed: {str(e)}"
+            print(f"Error: {error_message}")
+            self.root.after(0, lambda: messagebox.showerror("Error", error_message))
+            return
+        done, failed = counts["moved" if move else "copied"], counts["error"]
+        self._update_progress(f"{action}: {done} objects done, {failed} failed.\n")
+        if failed:
+            self.root.after(0, lambda: messagebox.showwarning(
+                f"{action} Finished", f"{done} objects done, {failed} failed. See progress log for details."))
+        changed = [(dst_bucket, dst_key)] + ([(src_bucket, src_key)] if move else [])
+        self.root.after(0, lambda: self._refresh_after_change(changed))
+
+    def _refresh_after_change(self, changed):
+        if self.listing_cache:
+            for bucket_name, key in changed:
+                parent = key.rstrip('/').rpartition('/')[0]
+                self.listing_cache.invalidate(bucket_name, f"{parent}/" if parent else '')
+        self.load_buckets()
+
     def show_preview_context_menu(self, event):
-        if self.preview_listbox.size() > 0:
+        if len(self.selection) > 0:
             self.preview_menu.tk_popup(event.x_root, event.y_root)
 
     def select_file(self):
       selected_item = self.tree.selection()[0]
       if 'file' in self.tree.item(selected_item, 'tags'):
-          full_path = self.get_full_path(selected_item)
-          if full_path not in self.preview_listbox.get(0, tk.END):
-              self.preview_listbox.insert(tk.END, full_path)
+          self.selection.add(self.get_full_path(selected_item))
+          self.selection_view.refresh()
       else:
           self.select_all_files_in_folder(selected_item)
       self.check_download_button_state()
 
     def select_all_files_in_folder(self, folder_item):
-        children = self.tree.get_children(folder_item)
-        for child in children:
-            if 'file' in self.tree.item(child, 'tags'):
-                full_path = self.get_full_path(child)
-                if full_path not in self.preview_listbox.get(0, tk.END):
-                    self.preview_listbox.insert(tk.END, full_path)
-            else:
-                self.select_all_files_in_folder(child)
+        # เลือกทั้งโฟลเดอร์เป็น prefix; รายชื่อไฟล์จะถูกดึงจาก server ตอนดาวน์โหลด
+        bucket_name, prefix = self._split_node_path(folder_item)
+        self.selection.add(f"{bucket_name}/{prefix}")
+        self.selection_view.refresh()
 
     def get_full_path(self, item):
+        path = self.tree_model.path(item)
+        if path is not None:
+            return path
         path = self.tree.item(item, 'text')
         parent = self.tree.parent(item)
         while parent:
@@ -352,104 +1406,306 @@ class FileManagerApp:
         return path
 
     def check_download_button_state(self, event=None):
-        if self.preview_listbox.size() > 0:
+        self.preview_label.config(text=f"Selected Files: {len(self.selection)}")
+        if len(self.selection) > 0:
             self.download_button.config(state=tk.NORMAL)
         else:
             self.download_button.config(state=tk.DISABLED)
 
     def delete_selected_file(self):
         try:
-            selected_index = self.preview_listbox.curselection()
-            if selected_index:
-                self.preview_listbox.delete(selected_index)
+            selected_index = self.selection_view.selected_index()
+            if selected_index is not None:
+                self.selection.remove_at(selected_index)
+                self.selection_view.refresh()
                 self.check_download_button_state()
         except Exception as e:
             print(f"Error: Failed to delete selected file: {str(e)}")
             messagebox.showerror("Error", f"Failed to delete selected file: {str(e)}")
 
     def download_files(self):
-      selected_files = self.preview_listbox.get(0, tk.END)
-      if not selected_files:
+      if not len(self.selection):
           messagebox.showwarning("Warning", "No files selected for download.")
           return
 
-      self.progress_text.delete(1.0, tk.END)
-      self.download_button.config(state=tk.DISABLED)
-
-      download_thread = threading.Thread(target=self._download_files_thread, args=(selected_files,))
-      download_thread.start()
-
-    def _download_files_thread(self, selected_files):
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            results = executor.map(self._download_single_file, selected_files)
-
-        for result in results:
-            if result:
-                self._update_progress(result)
-
-        self._update_progress("All downloads completed.\n")
-        self.download_button.config(state=tk.NORMAL)
+      if self.queue_runner is None:
+          messagebox.showwarning("Warning", "Connect to a MinIO Server first.")
+          return
 
-    def _download_single_file(self, file_path):
+      # ขนาดจาก index ใช้จัดลำดับไฟล์เล็กก่อน; ไฟล์ที่ไม่รู้ขนาดจะถูกดาวน์โหลดก่อน
+      files = [(file_path, self.object_index.meta.get(file_path, (None,))[0]) for file_path in self.selection.files()]
+      job_id = self.queue_runner.submit(
+          files, self.selection.prefixes(), self.output_folder, sync=self.sync_mode.get(),
+          mirror_delete=self.mirror_delete.get(), priority=self.priority.get(),
+          rate_limit=int(self.job_limit.get() * 1024 * 1024)
+      )
+      self._update_progress(f"Queued download job {job_id}.\n")
+      self._refresh_queue_view(reschedule=False)
+
+    def _engine(self):
+        return TransferEngine(
+            self.minio_client,
+            manifest=self.manifest,
+            progress=self.progress,
+            on_event=self._on_transfer_event,
+            scheduler=self.scheduler,
+            throttles=(self.queue_runner.bandwidth,) if self.queue_runner else ()
+        )
+
+    def _on_transfer_event(self, event):
+        self._update_progress(describe_event(event))
+        if event["event"] in ("downloaded", "deleted_local") and event.get("path"):
+            # โฟลเดอร์นี้จะถูกอ่านใหม่ในรอบ refresh ถัดไป
+            with self.output_lock:
+                self.output_dirty.add(os.path.dirname(event["path"]))
+
+    def _bandwidth_bytes(self):
         try:
-            path_parts = file_path.split('/', 1)
-            if len(path_parts) != 2:
-                return f"Invalid file path: {file_path}\n"
-
-            bucket_name, object_name = path_parts
-            if self.is_windows:
-                # local_object_name = object_name
-                local_object_name = object_name.replace(':', '__')
-            elif self.is_linux:
-                # local_object_name = object_name
-                local_object_name = object_name.replace(':', '__')
+            return int(self.bandwidth_limit.get() * 1024 * 1024)
+        except tk.TclError:
+            return 0
+
+    def apply_bandwidth_limit(self, event=None):
+        if self.queue_runner:
+            self.queue_runner.bandwidth.set_rate(self._bandwidth_bytes())
+
+    def _selected_job(self):
+        selection = self.queue_tree.selection()
+        if not selection or self.queue_runner is None:
+            messagebox.showwarning("Warning", "Select a job in the download queue first.")
+            return None
+        return int(selection[0])
+
+    def pause_job(self):
+        job_id = self._selected_job()
+        if job_id is not None:
+            self.queue_runner.pause(job_id)
+            self._refresh_queue_view(reschedule=False)
+
+    def resume_job(self):
+        job_id = self._selected_job()
+        if job_id is not None:
+            self.queue_runner.resume(job_id)
+            self._refresh_queue_view(reschedule=False)
+
+    def cancel_job(self):
+        job_id = self._selected_job()
+        if job_id is not None and messagebox.askyesno("Cancel", "Cancel this download job?"):
+            threading.Thread(target=self.queue_runner.cancel, args=(job_id,), daemon=True).start()
+
+    def change_job_priority(self, step):
+        job_id = self._selected_job()
+        if job_id is not None:
+            job = self.transfer_queue.job(job_id)
+            self.transfer_queue.set_priority(job_id, job["priority"] + step)
+            self._refresh_queue_view(reschedule=False)
+
+    def set_job_limit(self):
+        job_id = self._selected_job()
+        if job_id is not None:
+            self.queue_runner.set_rate_limit(job_id, int(self.job_limit.get() * 1024 * 1024))
+            self._refresh_queue_view(reschedule=False)
+
+    def clear_finished_jobs(self):
+        if self.transfer_queue:
+            self.transfer_queue.clear_finished()
+            self._refresh_queue_view(reschedule=False)
+
+    def _refresh_queue_view(self, reschedule=True):
+        jobs = self.transfer_queue.jobs() if self.transfer_queue else []
+        shown = set(self.queue_tree.get_children())
+        for job in jobs:
+            item = str(job["id"])
+            files = f"{job['finished']}/{job['total']}" + (f" ({job['failed']} failed)" if job["failed"] else "")
+            limit = f"{job['rate_limit'] / (1024 * 1024):g}" if job["rate_limit"] else "-"
+            values = (job["state"], files, job["priority"], limit)
+            if item in shown:
+                self.queue_tree.item(item, text=job["label"], values=values)
+                shown.discard(item)
             else:
-                # local_object_name = object_name
-                local_object_name = object_name.replace(':', '__')
-
-            local_path = os.path.join(self.output_folder, local_object_name)
-            local_dir = os.path.dirname(local_path)
-
-            if not os.path.exists(local_dir):
-                os.makedirs(local_dir)
-
-            response = self.minio_client.get_object(bucket_name, object_name)
-            with open(local_path, 'wb') as file_data:
-                total_size = 0
-                for chunk in response.stream(5 * 1024 * 1024):
-                    file_data.write(chunk)
-                    total_size += len(chunk)
-                    self._update_progress(f"Downloading '{object_name}': {total_size / (1024 * 1024):.2f} MB downloaded...\n")
-
-            return f"'{object_name}': Downloaded successfully\n"
-        except Exception as e:
-            return f"Error downloading '{file_path}': {str(e)}\n"
+                self.queue_tree.insert('', tk.END, iid=item, text=job["label"], values=values)
+        if shown:
+            self.queue_tree.delete(*shown)
+        if reschedule:
+            self.root.after(QUEUE_REFRESH_MS, self._refresh_queue_view)
+
+    def _collect_metrics(self):
+        snapshot = self.progress.snapshot()
+        gauges = {f"scheduler_{key}": value for key, value in self.scheduler.stats().items()}
+        gauges.update(files_done=snapshot["files_done"], files_total=snapshot["files_total"],
+                      transfer_rate_bytes=snapshot["rate"])
+        return gauges
+
+    def on_close(self):
+        if self.queue_runner:
+            self.queue_runner.stop()
+        if self.instrumentation:
+            self.instrumentation.close()
+        self.root.destroy()
 
     def _update_progress(self, message):
-        def update():
-            self.progress_text.insert(tk.END, message)
+        # เรียกได้จากทุก thread; ข้อความจะถูกแสดงในรอบ _progress_tick ถัดไป
+        self.progress.log(message)
+
+    def _progress_tick(self):
+        lines = self.progress.drain_log()
+        if lines:
+            self.progress_text.insert(tk.END, ''.join(lines))
+            line_count = int(self.progress_text.index('end-1c').split('.')[0])
+            if line_count > PROGRESS_LOG_LINES:
+                self.progress_text.delete('1.0', f"{line_count - PROGRESS_LOG_LINES + 1}.0")
             self.progress_text.see(tk.END)
-        self.root.after(0, update)
+
+        snapshot = self.progress.snapshot()
+        files_done, files_total = snapshot["files_done"], snapshot["files_total"]
+        summary = f"{files_done}/{files_total} files | {snapshot['rate'] / (1024 * 1024):.2f} MB/s"
+        if snapshot["eta"] is not None:
+            summary += f" | ETA {time.strftime('%H:%M:%S', time.gmtime(snapshot['eta']))}"
+        scheduler = self.scheduler.stats()
+        summary += f" | {scheduler['in_flight']}/{scheduler['limit']} requests | {scheduler['retries']} retries"
+        self.progress_summary.config(text=summary if files_total else "")
+        self.progress_bar.config(value=100 * files_done / files_total if files_total else 0)
+
+        rows = []
+        for name, done, total in snapshot["active"][:PROGRESS_ACTIVE_ROWS]:
+            fraction = done / total if total else 0
+            bar = '#' * int(fraction * 20)
+            rows.append(f"[{bar:-<20}] {fraction:4.0%}  {name} ({done / (1024 * 1024):.1f}/{total / (1024 * 1024):.1f} MB)")
+        if len(snapshot["active"]) > PROGRESS_ACTIVE_ROWS:
+            rows.append(f"... and {len(snapshot['active']) - PROGRESS_ACTIVE_ROWS} more")
+        self.active_text.delete('1.0', tk.END)
+        self.active_text.insert(tk.END, '\n'.join(rows))
+
+        self.root.after(PROGRESS_TICK_MS, self._progress_tick)
 
     def load_output_tree(self):
-        for item in self.output_tree.get_children():
-            self.output_tree.delete(item)
+        self.output_generation += 1
+        self.output_model.clear()
+        self.output_scanned.clear()
+        with self.output_lock:
+            self.output_dirty.clear()
 
         if os.path.exists(self.output_folder):
-            self.insert_output_tree(self.output_folder, "")
+            self._scan_output_dirs([''])
 
     def refresh_output_folders(self):
-        self.load_output_tree()
+        if not self.output_scanned:
+            # ยังไม่เคยโหลด (หรือโฟลเดอร์เพิ่งถูกสร้าง) จึงโหลดใหม่ทั้ง tree
+            self.load_output_tree()
+        else:
+            # อ่านใหม่เฉพาะโฟลเดอร์ที่โหลดแล้วและ mtime เปลี่ยน
+            self._scan_output_dirs(list(self.output_scanned), only_changed=True)
         self._update_progress("Output folders refreshed.\n")
 
-    def insert_output_tree(self, path, parent):
-        for item in os.listdir(path):
-            item_path = os.path.join(path, item)
-            if os.path.isdir(item_path):
-                folder_node = self.output_tree.insert(parent, 'end', text=item, open=False)
-                self.insert_output_tree(item_path, folder_node)
-            else:
-                self.output_tree.insert(parent, 'end', text=item, open=False)
+    def on_output_tree_open(self, event):
+        node = self.output_tree.focus()
+        children = self.output_tree.get_children(node)
+        if len(children) == 1 and 'placeholder' in self.output_tree.item(children[0], 'tags'):
+            self.output_tree.delete(children[0])
+            self._scan_output_dirs([self.output_model.path(node)])
+
+    def _scan_output_dirs(self, rel_dirs, only_changed=False):
+        known = {rel_dir: self.output_scanned.get(rel_dir) if only_changed else None for rel_dir in rel_dirs}
+        threading.Thread(
+            target=self._scan_output_worker,
+            args=(self.output_generation, self.output_folder, known),
+            daemon=True
+        ).start()
+
+    def _scan_output_worker(self, generation, output_folder, known):
+        for rel_dir, known_mtime in known.items():
+            path = os.path.join(output_folder, *rel_dir.split('/')) if rel_dir else output_folder
+            try:
+                # อ่าน mtime ก่อน scandir ถ้ามีไฟล์เพิ่มระหว่างอ่าน mtime จะเปลี่ยนและถูกอ่านใหม่รอบหน้า
+                mtime = os.stat(path).st_mtime_ns
+                if mtime == known_mtime:
+                    continue
+                entries = []
+                with os.scandir(path) as iterator:
+                    for entry in iterator:
+                        try:
+                            is_dir = entry.is_dir()
+                        except OSError:
+                            is_dir = False
+                        entries.append((entry.name, is_dir))
+                entries.sort()
+            except FileNotFoundError:
+                mtime, entries = None, None
+            except OSError as e:
+                print(f"Error: Failed to read {path}: {str(e)}")
+                continue
+            self.output_queue.put((generation, rel_dir, mtime, entries))
+
+    def _drain_output_queue(self):
+        deadline = time.monotonic() + LISTING_DRAIN_BUDGET
+        while time.monotonic() < deadline:
+            try:
+                generation, rel_dir, mtime, entries = self.output_queue.get_nowait()
+            except queue.Empty:
+                break
+            if generation == self.output_generation:
+                self._apply_output_listing(rel_dir, mtime, entries)
+
+        now = time.monotonic()
+        if now - self.output_last_refresh >= OUTPUT_REFRESH_MS / 1000:
+            with self.output_lock:
+                dirty, self.output_dirty = self.output_dirty, set()
+            if dirty:
+                self.output_last_refresh = now
+                self._refresh_output_paths(dirty)
+        self.root.after(LISTING_POLL_MS, self._drain_output_queue)
+
+    def _refresh_output_paths(self, directories):
+        if not self.output_scanned:
+            self.load_output_tree()
+            return
+        rel_dirs = set()
+        for directory in directories:
+            rel_dir = os.path.relpath(directory, self.output_folder)
+            if rel_dir.startswith('..'):
+                continue
+            rel_dir = '' if rel_dir == '.' else rel_dir.replace(os.sep, '/')
+            # โฟลเดอร์ใหม่จะปรากฏใน parent ที่โหลดไว้แล้ว จึงตรวจทุกระดับขึ้นไป
+            while True:
+                if rel_dir in self.output_scanned:
+                    rel_dirs.add(rel_dir)
+                if not rel_dir:
+                    break
+                rel_dir = rel_dir.rpartition('/')[0]
+        if rel_dirs:
+            self._scan_output_dirs(sorted(rel_dirs), only_changed=True)
+
+    def _apply_output_listing(self, rel_dir, mtime, entries):
+        parent = self.output_model.node(rel_dir) if rel_dir else ''
+        if parent is None:
+            return
+        if entries is None:
+            self._forget_output_path(rel_dir)
+            if parent:
+                self.output_model.remove(parent)
+            return
+        scanned = self.output_scanned.get(rel_dir)
+        if scanned is not None and mtime < scanned:
+            # ผลจากการอ่านที่เก่ากว่าที่แสดงอยู่
+            return
+        self.output_scanned[rel_dir] = mtime
+
+        current = {(f"{rel_dir}/{name}" if rel_dir else name): is_dir for name, is_dir in entries}
+        for path in list(self.output_model.children.get(rel_dir, ())):
+            if path not in current or current[path] == (path in self.output_model.files):
+                self._forget_output_path(path)
+                self.output_model.remove(self.output_model.node(path))
+        for path, is_dir in current.items():
+            if self.output_model.node(path):
+                continue
+            node = self.output_model.insert(parent, path.rpartition('/')[2], is_file=not is_dir, open=False)
+            if is_dir:
+                self.output_tree.insert(node, 'end', text=PLACEHOLDER_TEXT, tags=('placeholder',))
+
+    def _forget_output_path(self, rel_dir):
+        for scanned in list(self.output_scanned):
+            if scanned == rel_dir or scanned.startswith(f"{rel_dir}/"):
+                del self.output_scanned[scanned]
 
     def select_output_folder(self):
         folder_selected = filedialog.askdirectory()
@@ -461,7 +1717,8 @@ class FileManagerApp:
 
     def clear_selected_files(self):
       try:
-          self.preview_listbox.delete(0, tk.END)
+          self.selection.clear()
+          self.selection_view.refresh()
           self.check_download_button_state()  # อัปเดตสถานะของปุ่มดาวน์โหลด
           self._update_progress("Cleared all selected files.\n")
       except Exception as e:
@@ -473,7 +1730,15 @@ class FileManagerApp:
             "endpoint": endpoint,
             "access_key": access_key,
             "secret_key": secret_key,
-            "output_folder": self.output_folder
+            "output_folder": self.output_folder,
+            "lazy_listing": self.lazy_listing.get(),
+            "upload_workers": self.upload_workers.get(),
+            "sync_mode": self.sync_mode.get(),
+            "cache_ttl": self.cache_ttl.get(),
+            "snowball_threshold_kb": self.snowball_threshold.get(),
+            "snowball_batch_mb": self.snowball_batch.get(),
+            "compression": self.compression.get(),
+            "bandwidth_limit_mb": self.bandwidth_limit.get()
         }
         with open("minio_config.json", "w") as config_file:
             json.dump(config, config_file)
@@ -486,7 +1751,17 @@ class FileManagerApp:
                 self.access_key_entry.insert(0, config.get("access_key", ""))
                 self.secret_key_entry.insert(0, config.get("secret_key", ""))
                 self.output_folder = config.get("output_folder", os.getcwd())
+                self.lazy_listing.set(config.get("lazy_listing", True))
+                self.upload_workers.set(config.get("upload_workers", UPLOAD_WORKERS))
+                self.sync_mode.set(config.get("sync_mode", False))
+                self.cache_ttl.set(config.get("cache_ttl", CACHE_TTL))
+                self.snowball_threshold.set(config.get("snowball_threshold_kb", 0))
+                self.snowball_batch.set(config.get("snowball_batch_mb", SNOWBALL_BATCH_SIZE // (1024 * 1024)))
+                if config.get("compression", "off") in self.compression_box.cget("values"):
+                    self.compression.set(config.get("compression", "off"))
+                self.bandwidth_limit.set(config.get("bandwidth_limit_mb", 0))
                 self.check_inputs(None)
+            self.load_output_tree()
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,43 @@
+"""Compare two benchmark reports written by ``benchmarks.run``.
+
+    python -m benchmarks.compare before.json after.json [--threshold 10]
+
+Exits with status 1 when any case got slower by more than ``--threshold``
+percent, so it can gate CI.
+"""
+import argparse
+import json
+import sys
+
+
+def load(path):
+    with open(path) as report_file:
+        report = json.load(report_file)
+    return report, {(r["benchmark"], r["shape"], r.get("backend")): r for r in report["results"]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.compare")
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, help="fail if a case is this many percent slower")
+    args = parser.parse_args(argv)
+
+    before_report, before = load(args.before)
+    after_report, after = load(args.after)
+    print(f"{before_report.get('commit')} -> {after_report.get('commit')}")
+    print(f"{'benchmark':<12} {'shape':<11} {'before s':>10} {'after s':>10} {'change':>8} {'peak RSS MB':>12}")
+
+    regressed = False
+    for key in sorted(before.keys() & after.keys()):
+        old, new = before[key], after[key]
+        change = (new["seconds"] - old["seconds"]) / old["seconds"] * 100 if old["seconds"] else 0.0
+        rss = f"{(new.get('peak_rss_kb') or 0) / 1024:.0f}"
+        print(f"{key[0]:<12} {key[1]:<11} {old['seconds']:>10.3f} {new['seconds']:>10.3f} {change:>+7.1f}% {rss:>12}")
+        if args.threshold is not None and change > args.threshold:
+            regressed = True
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
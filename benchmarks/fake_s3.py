@@ -0,0 +1,254 @@
+"""S3 stand-ins for the benchmarks.
+
+``FakeMinio`` is an in-process fake that implements the subset of the
+minio-py client the app uses; object bodies are generated on the fly so a
+"huge" bucket costs no memory. ``MinioServer`` starts a real ``minio``
+binary on a temporary directory for end-to-end numbers.
+"""
+import bisect
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime
+
+from minio.error import S3Error
+
+ZERO_CHUNK = bytes(1024 * 1024)
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+# รูปแบบ bucket สังเคราะห์: (จำนวน object, ขนาดต่อ object, ฟังก์ชันสร้างชื่อ)
+SHAPES = {
+    "many_small": (20000, 4 * 1024, lambda i: f"small/d{i % 100:03d}/f{i:07d}.bin"),
+    "few_huge": (4, 128 * 1024 * 1024, lambda i: f"huge/f{i}.bin"),
+    "deep": (20000, 1024, lambda i: "/".join(f"l{(i >> depth) % 4}" for depth in range(10)) + f"/f{i:07d}.bin"),
+    "wide": (100000, 1024, lambda i: f"wide/f{i:07d}.bin"),
+}
+
+
+def shape_objects(shape, scale=1.0):
+    count, size, name = SHAPES[shape]
+    return [(name(i), size) for i in range(max(1, int(count * scale)))]
+
+
+class FakeObject:
+    def __init__(self, bucket_name, object_name, size=None, is_dir=False):
+        self.bucket_name = bucket_name
+        self.object_name = object_name
+        self.size = size
+        self.is_dir = is_dir
+        self.etag = None if is_dir else f"{size:x}-{len(object_name):x}"
+        self.last_modified = None if is_dir else EPOCH
+        self.metadata = {}
+
+
+class FakeBucket:
+    def __init__(self, name):
+        self.name = name
+        self.creation_date = EPOCH
+
+
+class FakeResponse:
+    def __init__(self, obj, length):
+        self.length = length
+        self.headers = {
+            "Content-Length": str(length),
+            "ETag": f'"{obj.etag}"',
+            "Last-Modified": format_datetime(EPOCH, usegmt=True),
+        }
+
+    def stream(self, amt):
+        remaining = self.length
+        while remaining > 0:
+            size = min(amt, remaining, len(ZERO_CHUNK))
+            remaining -= size
+            yield ZERO_CHUNK[:size]
+
+    def close(self):
+        pass
+
+    def release_conn(self):
+        pass
+
+
+class FakeWriteResult:
+    def __init__(self, etag):
+        self.etag = etag
+        self.last_modified = EPOCH
+
+
+class FakeMinio:
+    """In-memory stand-in for ``minio.Minio``; ``latency`` adds a fixed delay per request."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.buckets = {}
+
+    def _wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def bucket_exists(self, bucket_name):
+        return bucket_name in self.buckets
+
+    def make_bucket(self, bucket_name):
+        self.buckets.setdefault(bucket_name, ([], {}))
+
+    def populate(self, bucket_name, objects):
+        self.make_bucket(bucket_name)
+        keys, sizes = self.buckets[bucket_name]
+        sizes.update(objects)
+        keys[:] = sorted(sizes)
+
+    def list_buckets(self):
+        self._wait()
+        return [FakeBucket(name) for name in sorted(self.buckets)]
+
+    def list_objects(self, bucket_name, prefix=None, recursive=False, start_after=None, **kwargs):
+        keys, sizes = self.buckets[bucket_name]
+        prefix = prefix or ''
+        index = bisect.bisect_left(keys, prefix)
+        if start_after:
+            index = max(index, bisect.bisect_right(keys, start_after))
+        # จำลองการแบ่งหน้าทีละ 1000 key เหมือน S3
+        page = 0
+        while index < len(keys) and keys[index].startswith(prefix):
+            if page % 1000 == 0:
+                self._wait()
+            page += 1
+            key = keys[index]
+            slash = -1 if recursive else key.find('/', len(prefix))
+            if slash >= 0:
+                common = key[:slash + 1]
+                yield FakeObject(bucket_name, common, is_dir=True)
+                index = bisect.bisect_left(keys, common + '\U0010ffff', index)
+            else:
+                yield FakeObject(bucket_name, key, sizes[key])
+                index += 1
+
+    def _object(self, bucket_name, object_name):
+        sizes = self.buckets[bucket_name][1]
+        if object_name not in sizes:
+            raise S3Error("NoSuchKey", "Object does not exist", object_name, None, None, None)
+        return FakeObject(bucket_name, object_name, sizes[object_name])
+
+    def stat_object(self, bucket_name, object_name):
+        self._wait()
+        return self._object(bucket_name, object_name)
+
+    def get_object(self, bucket_name, object_name, offset=0, length=0, **kwargs):
+        self._wait()
+        obj = self._object(bucket_name, object_name)
+        return FakeResponse(obj, length or obj.size - offset)
+
+    def put_object(self, bucket_name, object_name, data, length, progress=None, **kwargs):
+        self._wait()
+        if progress:
+            progress.set_meta(object_name=object_name, total_length=length)
+        received = 0
+        while True:
+            chunk = data.read(len(ZERO_CHUNK))
+            if not chunk:
+                break
+            received += len(chunk)
+            if progress:
+                progress.update(len(chunk))
+        self.make_bucket(bucket_name)
+        keys, sizes = self.buckets[bucket_name]
+        if object_name not in sizes:
+            bisect.insort(keys, object_name)
+        sizes[object_name] = received
+        return FakeWriteResult(f"{received:x}")
+
+    def upload_snowball_objects(self, bucket_name, object_list, **kwargs):
+        self._wait()
+        self.make_bucket(bucket_name)
+        keys, sizes = self.buckets[bucket_name]
+        for obj in object_list:
+            size = os.path.getsize(obj._filename) if obj._filename else obj._length
+            if obj._object_name not in sizes:
+                bisect.insort(keys, obj._object_name)
+            sizes[obj._object_name] = size
+        return FakeWriteResult("snowball")
+
+    def copy_object(self, bucket_name, object_name, source, **kwargs):
+        self._wait()
+        size = self._object(source.bucket_name, source.object_name).size
+        self.make_bucket(bucket_name)
+        keys, sizes = self.buckets[bucket_name]
+        if object_name not in sizes:
+            bisect.insort(keys, object_name)
+        sizes[object_name] = size
+        return FakeWriteResult(f"{size:x}")
+
+    def compose_object(self, bucket_name, object_name, sources, **kwargs):
+        return self.copy_object(bucket_name, object_name, sources[0])
+
+    def remove_objects(self, bucket_name, delete_object_list, **kwargs):
+        keys, sizes = self.buckets[bucket_name]
+        for delete_object in delete_object_list:
+            sizes.pop(delete_object._name, None)
+        keys[:] = sorted(sizes)
+        return iter(())
+
+
+class ZeroReader:
+    """File-like object of ``size`` zero bytes, used to populate a real server."""
+
+    def __init__(self, size):
+        self.remaining = size
+
+    def read(self, size=-1):
+        size = self.remaining if size < 0 else min(size, self.remaining)
+        self.remaining -= size
+        return bytes(size)
+
+
+class MinioServer:
+    """Runs a throwaway ``minio server`` on a free local port."""
+
+    access_key = "benchadmin"
+    secret_key = "benchadmin-secret"
+
+    def __init__(self, binary="minio"):
+        self.binary = shutil.which(binary) or binary
+        self.data_dir = None
+        self.process = None
+        self.endpoint = None
+
+    def __enter__(self):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        self.endpoint = f"127.0.0.1:{port}"
+        self.data_dir = tempfile.mkdtemp(prefix="minio-bench-")
+        env = dict(os.environ, MINIO_ROOT_USER=self.access_key, MINIO_ROOT_PASSWORD=self.secret_key)
+        self.process = subprocess.Popen(
+            [self.binary, "server", self.data_dir, "--address", self.endpoint, "--quiet"],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+                return self
+            except OSError:
+                time.sleep(0.2)
+        self.__exit__(None, None, None)
+        raise RuntimeError(f"MinIO server did not start on {self.endpoint}")
+
+    def __exit__(self, *exc_info):
+        if self.process:
+            self.process.terminate()
+            self.process.wait(timeout=10)
+        if self.data_dir:
+            shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def populate(self, client, bucket_name, objects):
+        if not client.bucket_exists(bucket_name):
+            client.make_bucket(bucket_name)
+        for object_name, size in objects:
+            client.put_object(bucket_name, object_name, ZeroReader(size), size)
@@ -0,0 +1,254 @@
+"""Benchmark listing, tree building, selection and transfers.
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --backend minio --minio-binary ./minio --scale 0.1
+    python -m benchmarks.compare before.json after.json
+
+Every case runs in its own subprocess so the reported peak RSS belongs to
+that case alone. Results are written as JSON for comparison across commits.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import types
+
+from .fake_s3 import SHAPES, FakeMinio, MinioServer, shape_objects
+
+CASES = ("tree_build", "select_all", "download", "upload", "upload_snowball")
+BUCKET_PREFIX = "bench"
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_kb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS รายงานเป็น byte ส่วน Linux เป็น KB
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+class NullTree:
+    """Minimal ttk.Treeview stand-in used when no display is available."""
+
+    def __init__(self):
+        self.items = {}
+        self.counter = 0
+
+    def insert(self, parent, index, text='', tags=(), **kwargs):
+        self.counter += 1
+        node = f"I{self.counter:06X}"
+        self.items[node] = (parent, text, tags, [])
+        if parent:
+            self.items[parent][3].append(node)
+        return node
+
+    def delete(self, *nodes):
+        for node in nodes:
+            self.items.pop(node, None)
+
+    def get_children(self, node=''):
+        if not node:
+            return tuple(n for n, item in self.items.items() if not item[0])
+        return tuple(self.items[node][3])
+
+    def item(self, node, option=None):
+        parent, text, tags, _ = self.items[node]
+        return {'text': text, 'tags': tags}[option] if option else {'text': text, 'tags': tags}
+
+    def exists(self, node):
+        return node in self.items
+
+
+def make_app():
+    """Build a FileManagerApp with only the widgets the benchmarked methods touch."""
+    import app
+
+    gui = app.FileManagerApp.__new__(app.FileManagerApp)
+    try:
+        import tkinter as tk
+        from tkinter import ttk
+        root = tk.Tk()
+        root.withdraw()
+        gui.tree = ttk.Treeview(root)
+        widgets = "tk"
+    except Exception:
+        gui.tree = NullTree()
+        widgets = "null"
+    gui.tree_model = app.TreeModel(gui.tree)
+    gui.selection = app.SelectionModel()
+    gui.selection_view = types.SimpleNamespace(refresh=lambda: None)
+    gui.listing_count = 0
+    gui.lazy_listing = types.SimpleNamespace(get=lambda: False)
+    return gui, widgets
+
+
+def shape_bucket(shape):
+    # ชื่อ bucket ใช้ '_' ไม่ได้; แต่ละ shape มี bucket ของตัวเองเพื่อให้ listing นับเฉพาะ shape นั้น
+    return f"{BUCKET_PREFIX}-{shape.replace('_', '-')}"
+
+
+def upload_bucket(shape, case):
+    # upload แยก bucket เพื่อไม่ให้ object ที่อัปโหลดไปปนกับ case อื่น
+    return f"{shape_bucket(shape)}-{case.replace('_', '-')}"
+
+
+def make_client(args):
+    if args.endpoint:
+        from minio_manager import create_client
+        return create_client(args.endpoint, MinioServer.access_key, MinioServer.secret_key)
+    client = FakeMinio(latency=args.latency_ms / 1000)
+    client.populate(shape_bucket(args.shape), shape_objects(args.shape, args.scale))
+    return client
+
+
+def run_case(args):
+    from minio_manager import TransferEngine
+    from minio_manager.engine import SNOWBALL_THRESHOLD
+
+    client = make_client(args)
+    bucket_name = shape_bucket(args.shape)
+    objects = shape_objects(args.shape, args.scale)
+    total_bytes = sum(size for _, size in objects)
+    result = {"benchmark": args.case, "shape": args.shape, "objects": len(objects), "bytes": total_bytes}
+    workdir = tempfile.mkdtemp(prefix="minio-bench-")
+    try:
+        if args.case in ("tree_build", "select_all"):
+            gui, result["widgets"] = make_app()
+            names = [obj.object_name for obj in client.list_objects(bucket_name, recursive=True)]
+            bucket_node = gui.tree_model.insert('', bucket_name)
+            result["bytes"] = 0
+            baseline = peak_rss_kb()
+            started = time.perf_counter()
+            gui.load_objects(bucket_name, names)
+            if args.case == "select_all":
+                # เลือกทั้ง bucket แล้วขยาย selection เป็นรายชื่อ object แบบเดียวกับตอนดาวน์โหลด
+                engine = TransferEngine(client)
+                started = time.perf_counter()
+                gui.select_all_files_in_folder(bucket_node)
+                expanded = list(gui.selection.files())
+                for selected_prefix in gui.selection.prefixes():
+                    selected_bucket, _, prefix = selected_prefix.partition('/')
+                    expanded.extend(engine.iter_objects(selected_bucket, prefix))
+                result["errors"] = abs(len(expanded) - len(objects))
+            elapsed = time.perf_counter() - started
+        elif args.case == "download":
+            engine = TransferEngine(client)
+            baseline = peak_rss_kb()
+            started = time.perf_counter()
+            counts = engine.download(engine.iter_objects(bucket_name, sizes=True), workdir)
+            elapsed = time.perf_counter() - started
+            result["errors"] = counts["error"]
+        else:
+            for object_name, size in objects:
+                local_path = os.path.join(workdir, *object_name.split('/'))
+                os.makedirs(os.path.dirname(local_path), exist_ok=True)
+                with open(local_path, 'wb') as local_file:
+                    # sparse file: ไม่กินพื้นที่ดิสก์จริง
+                    local_file.truncate(size)
+            target = upload_bucket(args.shape, args.case)
+            if not client.bucket_exists(target):
+                client.make_bucket(target)
+            engine = TransferEngine(client)
+            baseline = peak_rss_kb()
+            started = time.perf_counter()
+            snowball_threshold = SNOWBALL_THRESHOLD if args.case == "upload_snowball" else 0
+            pipeline = engine.upload_folder(target, workdir, "uploaded", snowball_threshold=snowball_threshold)
+            elapsed = time.perf_counter() - started
+            result["errors"] = pipeline.failed
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    result.update(
+        seconds=round(elapsed, 4),
+        objects_per_s=round(result["objects"] / elapsed, 1) if elapsed else None,
+        mb_per_s=round(result["bytes"] / elapsed / (1024 * 1024), 2) if elapsed and result["bytes"] else None,
+        baseline_rss_kb=baseline,
+        peak_rss_kb=peak_rss_kb(),
+    )
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_all(args):
+    results = []
+    server = MinioServer(args.minio_binary) if args.backend == "minio" else None
+    if server:
+        server.__enter__()
+    try:
+        if server:
+            from minio_manager import create_client
+            client = create_client(server.endpoint, server.access_key, server.secret_key)
+            for shape in args.shapes:
+                server.populate(client, shape_bucket(shape), shape_objects(shape, args.scale))
+        for shape in args.shapes:
+            for case in args.cases:
+                command = [sys.executable, "-m", "benchmarks.run", "--case", case, "--shape", shape,
+                           "--scale", str(args.scale), "--latency-ms", str(args.latency_ms)]
+                if server:
+                    command += ["--endpoint", server.endpoint]
+                output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+                result = json.loads(output.splitlines()[-1])
+                result["backend"] = args.backend
+                results.append(result)
+                print(json.dumps(result), file=sys.stderr)
+    finally:
+        if server:
+            server.__exit__(None, None, None)
+
+    report = {
+        "commit": git_commit(),
+        "label": args.label,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scale": args.scale,
+        "latency_ms": args.latency_ms,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description="Benchmark MinIO File Manager.")
+    parser.add_argument("--backend", choices=("fake", "minio"), default="fake")
+    parser.add_argument("--minio-binary", default="minio")
+    parser.add_argument("--shapes", nargs="+", choices=sorted(SHAPES), default=sorted(SHAPES))
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=list(CASES))
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply object counts by this factor")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="per-request delay of the fake backend")
+    parser.add_argument("--label", help="free-form name stored in the report")
+    parser.add_argument("--output", "-o", help="write the JSON report here instead of stdout")
+    # ใช้ภายใน: รันเพียง case เดียวใน subprocess
+    parser.add_argument("--case", choices=CASES, help=argparse.SUPPRESS)
+    parser.add_argument("--shape", choices=sorted(SHAPES), help=argparse.SUPPRESS)
+    parser.add_argument("--endpoint", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.case:
+        print(json.dumps(run_case(args)))
+    else:
+        run_all(args)
+
+
+if __name__ == "__main__":
+    main()
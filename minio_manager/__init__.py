@@ -0,0 +1,13 @@
+"""Headless transfer engine and CLI for MinIO File Manager."""
+from .engine import (
+    MinioProgress,
+    RangedDownload,
+    SyncManifest,
+    TransferEngine,
+    TransferProgress,
+    UploadPipeline,
+    create_client,
+    describe_event,
+    local_path_for,
+)
+from .jobs import QueueRunner, TransferQueue
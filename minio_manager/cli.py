@@ -0,0 +1,188 @@
+"""Command line entry point: ``python -m minio_manager``.
+
+Every transfer event is written to stdout as one JSON object per line.
+Exit codes: 0 when everything succeeded, 1 when some transfers failed and
+2 when the command could not run at all (bad arguments, connection error).
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+from .engine import (
+    COPY_WORKERS, DOWNLOAD_WORKERS, MANIFEST_PATH, SNOWBALL_BATCH_SIZE, SNOWBALL_THRESHOLD, UPLOAD_WORKERS,
+    SyncManifest, TransferEngine, create_client
+)
+from .compression import available_codecs
+from .metrics import ENV_EVENT_LOG, ENV_METRICS_FILE, ENV_METRICS_PORT, ENV_PROFILE, Instrumentation, registry
+from .scheduler import MAX_IN_FLIGHT, TokenBucket, TransferScheduler
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_ERROR = 2
+
+CONFIG_PATH = "minio_config.json"
+
+
+def load_config(path=CONFIG_PATH):
+    if os.path.exists(path):
+        with open(path, "r") as config_file:
+            return json.load(config_file)
+    return {}
+
+
+def split_remote(remote):
+    bucket_name, _, prefix = remote.partition('/')
+    return bucket_name, prefix
+
+
+def build_parser(config):
+    parser = argparse.ArgumentParser(
+        prog="python -m minio_manager",
+        description="Bulk download, upload and sync for MinIO without the GUI."
+    )
+    parser.add_argument("--endpoint", default=os.environ.get("MINIO_ENDPOINT", config.get("endpoint")))
+    parser.add_argument("--access-key", default=os.environ.get("MINIO_ACCESS_KEY", config.get("access_key")))
+    parser.add_argument("--secret-key", default=os.environ.get("MINIO_SECRET_KEY", config.get("secret_key")))
+    parser.add_argument("--secure", action="store_true", help="use HTTPS")
+    parser.add_argument("--manifest", default=MANIFEST_PATH, help="sync manifest database")
+    parser.add_argument("--max-in-flight", type=int, default=MAX_IN_FLIGHT,
+                        help="upper bound for concurrent requests; the actual number adapts to the link")
+    parser.add_argument("--bandwidth", type=float, metavar="MB/s", default=0,
+                        help="limit the combined transfer rate (0 = unlimited)")
+    parser.add_argument("--event-log", metavar="PATH", default=os.environ.get(ENV_EVENT_LOG),
+                        help="append a JSON line per S3 request and listing page")
+    parser.add_argument("--metrics-file", metavar="PATH", default=os.environ.get(ENV_METRICS_FILE),
+                        help="write Prometheus-format metrics here periodically and on exit")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT", default=os.environ.get(ENV_METRICS_PORT),
+                        help="serve Prometheus-format metrics on localhost:PORT")
+    parser.add_argument("--profile", metavar="PATH", default=os.environ.get(ENV_PROFILE),
+                        help="write cProfile stats of all threads to PATH on exit")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    download = subparsers.add_parser("download", help="download every object under bucket[/prefix]")
+    download.add_argument("remote", nargs="+", help="bucket or bucket/prefix")
+    download.add_argument("--output", "-o", default=config.get("output_folder", os.getcwd()))
+    download.add_argument("--workers", type=int, default=DOWNLOAD_WORKERS)
+
+    upload = subparsers.add_parser("upload", help="upload the contents of a local folder to bucket[/prefix]")
+    upload.add_argument("local")
+    upload.add_argument("remote")
+    upload.add_argument("--workers", type=int, default=UPLOAD_WORKERS)
+
+    sync = subparsers.add_parser("sync", help="transfer only new or changed files")
+    sync.add_argument("remote", help="bucket or bucket/prefix")
+    sync.add_argument("local")
+    sync.add_argument("--push", action="store_true", help="upload local changes instead of downloading")
+    sync.add_argument("--workers", type=int)
+
+    for name in ("copy", "move"):
+        server_copy = subparsers.add_parser(name, help=f"{name} bucket/key or bucket/prefix/ on the server")
+        server_copy.add_argument("source", help="bucket/key, or bucket/prefix/ for everything under it")
+        server_copy.add_argument("destination", help="bucket/key, or bucket/prefix/ for a prefix source")
+        server_copy.add_argument("--workers", type=int, default=COPY_WORKERS)
+
+    for subparser in (upload, sync):
+        subparser.add_argument("--batch-small", type=int, nargs="?", metavar="KB", default=0,
+                               const=SNOWBALL_THRESHOLD // 1024,
+                               help="upload files smaller than KB (default %(const)s) as server-extracted tar batches")
+        subparser.add_argument("--batch-size", type=int, metavar="MB", default=SNOWBALL_BATCH_SIZE // (1024 * 1024),
+                               help="maximum size of one tar batch")
+        subparser.add_argument("--compress", choices=available_codecs(),
+                               help="compress compressible files on the fly; downloads decompress automatically")
+
+    for subparser in (download, upload, sync):
+        if subparser is not sync:
+            subparser.add_argument("--sync", action="store_true", help="skip unchanged files")
+        subparser.add_argument("--mirror-delete", action="store_true",
+                               help="delete files that no longer exist on the source side")
+    return parser
+
+
+def main(argv=None):
+    config = load_config()
+    args = build_parser(config).parse_args(argv)
+    if not (args.endpoint and args.access_key and args.secret_key):
+        print("Missing --endpoint, --access-key or --secret-key", file=sys.stderr)
+        return EXIT_ERROR
+
+    lock = threading.Lock()
+
+    def write_event(event):
+        with lock:
+            sys.stdout.write(json.dumps(event) + "\n")
+            sys.stdout.flush()
+
+    scheduler = TransferScheduler(maximum=args.max_in_flight)
+    collect = lambda: {f"scheduler_{key}": value for key, value in scheduler.stats().items()}
+    registry.collectors.append(collect)
+    instrumentation = None
+    try:
+        # เปิด log/port ไม่ได้ (เช่น port ถูกใช้อยู่) ให้รายงานเป็น fatal event เหมือนข้อผิดพลาดอื่น
+        instrumentation = Instrumentation(event_log=args.event_log, metrics_file=args.metrics_file,
+                                          metrics_port=args.metrics_port, profile=args.profile)
+        client = create_client(args.endpoint, args.access_key, args.secret_key, secure=args.secure,
+                               max_connections=args.max_in_flight)
+        manifest = SyncManifest(args.manifest, args.endpoint)
+        throttles = (TokenBucket(int(args.bandwidth * 1024 * 1024)),) if args.bandwidth > 0 else ()
+        engine = TransferEngine(client, manifest=manifest, on_event=write_event, scheduler=scheduler,
+                                throttles=throttles)
+
+        if args.command == "sync":
+            args.sync = True
+            if args.push:
+                args.command, args.workers = "upload", args.workers or UPLOAD_WORKERS
+            else:
+                args.command, args.workers = "download", args.workers or DOWNLOAD_WORKERS
+                args.output, args.remote = args.local, [args.remote]
+
+        if args.command == "download":
+            summary = run_download(engine, args)
+        elif args.command in ("copy", "move"):
+            summary = run_copy(engine, args)
+        else:
+            summary = run_upload(engine, args)
+    except Exception as e:
+        write_event({"event": "fatal", "message": str(e)})
+        return EXIT_ERROR
+    finally:
+        registry.collectors.remove(collect)
+        if instrumentation:
+            instrumentation.close()
+
+    write_event(dict(summary, event="summary", retries=scheduler.stats()["retries"]))
+    return EXIT_FAILED if summary.get("error") else EXIT_OK
+
+
+def run_download(engine, args):
+    summary = {"downloaded": 0, "skipped": 0, "error": 0, "deleted": 0}
+    for remote in args.remote:
+        bucket_name, prefix = split_remote(remote)
+        # เวลาเริ่ม listing ใช้แยกไฟล์ที่ยังอยู่บน server ออกจากไฟล์ที่ถูกลบไปแล้ว
+        run = time.time() if args.mirror_delete else None
+        counts = engine.download(engine.iter_objects(bucket_name, prefix, run=run, sizes=True), args.output,
+                                 sync=args.sync, workers=args.workers)
+        for key, value in counts.items():
+            summary[key] += value
+        if args.mirror_delete:
+            summary["deleted"] += engine.delete_local_mirror(bucket_name, prefix, run)
+    return summary
+
+
+def run_copy(engine, args):
+    src_bucket, src_key = split_remote(args.source)
+    dst_bucket, dst_key = split_remote(args.destination)
+    return engine.copy(src_bucket, src_key, dst_bucket, dst_key, move=args.command == "move", workers=args.workers)
+
+
+def run_upload(engine, args):
+    bucket_name, prefix = split_remote(args.remote)
+    pipeline = engine.upload_folder(bucket_name, args.local, prefix.rstrip('/'), workers=args.workers,
+                                    sync=args.sync, mirror_delete=args.mirror_delete,
+                                    snowball_threshold=args.batch_small * 1024,
+                                    snowball_batch_size=args.batch_size * 1024 * 1024,
+                                    compression=args.compress)
+    return {"uploaded": pipeline.uploaded, "skipped": pipeline.skipped,
+            "error": pipeline.failed, "deleted": pipeline.deleted}
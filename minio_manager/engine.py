@@ -0,0 +1,1063 @@
+"""Headless transfer engine shared by the Tk GUI and the command line."""
+import json
+import os
+import queue
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from email.utils import parsedate_to_datetime
+
+from minio import Minio
+from minio.commonconfig import ComposeSource, CopySource, SnowballObject
+from minio.deleteobjects import DeleteObject
+from urllib3 import PoolManager, Timeout
+
+from .compression import (
+    CompressingReader, Decompressor, codec_of, decompress_file, is_compressible, metadata_for, original_size_of
+)
+from .metrics import RequestTimer, registry, timed_listing
+from .scheduler import MAX_IN_FLIGHT, TransferScheduler
+
+# จำนวนบรรทัด log สูงสุดที่เก็บรอแสดง และช่วงเวลาคำนวณ MB/s (วินาที)
+PROGRESS_LOG_LINES = 1000
+PROGRESS_RATE_WINDOW = 5.0
+
+# จำนวน thread สูงสุด; จำนวน request ที่ทำจริงพร้อมกันกำหนดโดย TransferScheduler
+DOWNLOAD_WORKERS = 16
+DOWNLOAD_CHUNK_SIZE = 5 * 1024 * 1024
+
+# object ที่ใหญ่กว่านี้จะดาวน์โหลดแบบแบ่งช่วงพร้อมกันและ resume ได้
+RANGED_DOWNLOAD_THRESHOLD = 64 * 1024 * 1024
+RANGE_PART_SIZE = 16 * 1024 * 1024
+RANGE_WORKERS = 16
+
+# ค่าเริ่มต้นของ upload pipeline
+UPLOAD_WORKERS = 16
+UPLOAD_PART_WORKERS = 4
+UPLOAD_PART_SIZE = 16 * 1024 * 1024
+# จำนวนงานที่รอในคิวได้ต่อ worker หนึ่งตัว
+UPLOAD_QUEUE_FACTOR = 4
+
+# ไฟล์ที่เล็กกว่า SNOWBALL_THRESHOLD รวมเป็น tar แล้วให้ server แตกไฟล์เอง (0 = ปิด)
+SNOWBALL_THRESHOLD = 1024 * 1024
+SNOWBALL_BATCH_SIZE = 64 * 1024 * 1024
+SNOWBALL_BATCH_FILES = 1000
+
+# copy_object ทำได้ครั้งเดียวไม่เกิน 5 GiB; ใหญ่กว่านั้นใช้ compose_object ซึ่งแบ่งเป็น multipart copy ฝั่ง server
+SERVER_COPY_LIMIT = 5 * 1024 * 1024 * 1024
+COPY_WORKERS = 16
+# header ของต้นทางที่ copy_object คงไว้ให้เอง แต่ compose_object ต้องส่งต่อเอง (นอกเหนือจาก x-amz-meta-*)
+COPIED_HEADERS = ("content-type", "cache-control", "content-encoding", "content-disposition", "content-language")
+# จำนวน key สูงสุดต่อหนึ่งคำขอ DeleteObjects
+DELETE_BATCH_SIZE = 1000
+# จำนวน key ที่บันทึกว่า "พบใน listing" ต่อหนึ่ง transaction
+SEEN_BATCH_SIZE = 1000
+
+# manifest สำหรับโหมด sync เก็บไว้ข้าง minio_config.json
+MANIFEST_PATH = "minio_manifest.sqlite"
+
+
+def create_client(endpoint, access_key, secret_key, secure=False, max_connections=MAX_IN_FLIGHT):
+    # ขนาด pool ต้องไม่น้อยกว่าจำนวน request พร้อมกันสูงสุด มิฉะนั้น connection จะถูกเปิด-ปิดใหม่ตลอด
+    # การ retry ทำใน TransferScheduler จึงปิด retry ของ urllib3
+    http_client = PoolManager(
+        timeout=Timeout(connect=10, read=60),
+        maxsize=max_connections,
+        retries=False
+    )
+    return Minio(
+        endpoint,
+        access_key=access_key,
+        secret_key=secret_key,
+        secure=secure,
+        http_client=http_client
+    )
+
+
+def source_metadata(headers):
+    """User metadata and content headers of a ``stat_object`` result, for ``compose_object``."""
+    return {key: value for key, value in (headers or {}).items()
+            if key.lower().startswith("x-amz-meta-") or key.lower() in COPIED_HEADERS}
+
+
+def prefix_end(prefix):
+    """Smallest string above every string that starts with ``prefix``, or None when there is no bound."""
+    # เพิ่มอักขระสุดท้ายขึ้นหนึ่ง; '\uffff' ใช้เป็นขอบบนไม่ได้ เพราะ key อาจมีอักขระนอก BMP
+    while prefix:
+        code = ord(prefix[-1]) + 1
+        if code <= 0x10ffff:
+            # surrogate เข้ารหัส UTF-8 ไม่ได้ จึงข้ามไปอักขระถัดไปที่ใช้ได้
+            return prefix[:-1] + chr(0xe000 if 0xd800 <= code <= 0xdfff else code)
+        prefix = prefix[:-1]
+    return None
+
+
+def local_path_for(output_folder, object_name):
+    # ':' ใช้เป็นชื่อไฟล์ไม่ได้บน Windows จึงแทนด้วย '__' ทุกแพลตฟอร์ม
+    return os.path.join(output_folder, object_name.replace(':', '__'))
+
+
+def describe_event(event):
+    """Render a transfer event as the one-line message shown in the GUI log."""
+    kind, key = event["event"], event.get("key")
+    if kind == "downloaded":
+        return f"'{key}': Downloaded successfully\n"
+    if kind == "uploaded":
+        return f"Uploaded: {key}\n"
+    if kind == "skipped":
+        return f"'{key}': Unchanged, skipped\n"
+    if kind == "deleted":
+        return f"Deleted: {key}\n"
+    if kind == "copied":
+        return f"Copied: {event['source']} -> {event['bucket']}/{key}\n"
+    if kind == "moved":
+        return f"Moved: {event['source']} -> {event['bucket']}/{key}\n"
+    if kind == "deleted_local":
+        return f"Deleted local copy of '{key}'\n"
+    if kind == "job_finished":
+        outcome = "cancelled" if event["state"] == "cancelled" else f"{event['failed']} of {event['total']} failed"
+        return f"Queue job '{event['label']}' finished ({outcome})\n"
+    if kind == "error":
+        return f"Error during {event['action']} of '{key}': {event['message']}\n"
+    return f"{json.dumps(event)}\n"
+
+
+class TransferProgress:
+    """Thread-safe progress counters for a batch of transfers.
+
+    Workers only bump byte and file counters here; the GUI samples a
+    snapshot on a fixed tick, so the cost of progress reporting does not grow
+    with chunk count or concurrency. Log lines are kept in a bounded buffer.
+    """
+
+    def __init__(self, log_lines=PROGRESS_LOG_LINES):
+        self.lock = threading.Lock()
+        self.active = {}
+        self.log_lines = deque(maxlen=log_lines)
+        self.samples = deque()
+        self.reset()
+
+    def reset(self, files_total=0, if_idle=False):
+        """Start a new batch; with ``if_idle`` nothing changes while transfers are still counted."""
+        with self.lock:
+            if if_idle and (self.active or self.files_done < self.files_total):
+                return
+            self.active.clear()
+            self.samples.clear()
+            self.files_total = files_total
+            self.files_done = 0
+            self.bytes_done = 0
+            self.started = time.monotonic()
+
+    def add_files(self, count=1):
+        with self.lock:
+            self.files_total += count
+
+    def start(self, name, total):
+        with self.lock:
+            self.active[name] = [0, total]
+
+    def advance(self, name, nbytes):
+        with self.lock:
+            self.bytes_done += nbytes
+            if name in self.active:
+                self.active[name][0] += nbytes
+
+    def rollback(self, name):
+        """Take back the bytes counted for ``name``, e.g. before it is retried."""
+        with self.lock:
+            if name in self.active:
+                self.bytes_done -= self.active[name][0]
+                self.active[name][0] = 0
+
+    def finish(self, name):
+        with self.lock:
+            self.active.pop(name, None)
+            self.files_done += 1
+
+    def log(self, message):
+        with self.lock:
+            self.log_lines.append(message)
+
+    def drain_log(self):
+        with self.lock:
+            lines = list(self.log_lines)
+            self.log_lines.clear()
+        return lines
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self.lock:
+            # อัตราเร็วคำนวณจากช่วงเวลาล่าสุด ไม่ใช่ค่าเฉลี่ยตั้งแต่เริ่ม
+            self.samples.append((now, self.bytes_done))
+            while len(self.samples) > 1 and now - self.samples[0][0] > PROGRESS_RATE_WINDOW:
+                self.samples.popleft()
+            first_time, first_bytes = self.samples[0]
+            rate = (self.bytes_done - first_bytes) / (now - first_time) if now > first_time else 0.0
+            active = [(name, done, total) for name, (done, total) in self.active.items()]
+            files_done, files_total = self.files_done, self.files_total
+            elapsed = now - self.started
+
+        eta = None
+        if 0 < files_done < files_total:
+            eta = elapsed * (files_total - files_done) / files_done
+        return {
+            "active": active,
+            "files_done": files_done,
+            "files_total": files_total,
+            "rate": rate,
+            "eta": eta
+        }
+
+
+class MinioProgress:
+    """Adapter that feeds minio-py ``progress=`` callbacks into TransferProgress."""
+
+    def __init__(self, progress):
+        self.progress = progress
+        self.name = None
+
+    def set_meta(self, object_name, total_length):
+        self.name = object_name
+        self.progress.start(object_name, total_length)
+
+    def update(self, size):
+        self.progress.advance(self.name, size)
+
+
+class RangedDownload:
+    """Parallel, resumable download of one large object.
+
+    Byte ranges are fetched concurrently with ``get_object(offset=, length=)``
+    and written in place into a preallocated ``<local_path>.part`` file.
+    Finished ranges are recorded in ``<local_path>.part.ranges`` so a restart
+    only fetches the ranges that are still missing.
+    """
+
+    def __init__(self, client, bucket_name, object_name, local_path, size, etag,
+                 part_size=RANGE_PART_SIZE, workers=RANGE_WORKERS, progress=None, scheduler=None, throttle=None):
+        self.client = client
+        self.bucket_name = bucket_name
+        self.object_name = object_name
+        self.local_path = local_path
+        self.size = size
+        self.etag = etag
+        self.part_size = part_size
+        self.workers = workers
+        self.progress = progress
+        self.scheduler = scheduler or TransferScheduler()
+        self.throttle = throttle
+        self.part_path = f"{local_path}.part"
+        self.state_path = f"{local_path}.part.ranges"
+        self.lock = threading.Lock()
+        self.done = set()
+
+    def run(self):
+        part_count = max(1, -(-self.size // self.part_size))
+        self.done = self._load_state()
+        if not os.path.exists(self.part_path):
+            self.done = set()
+        if self.progress:
+            self.progress(sum(self._range(i)[1] for i in self.done))
+
+        with open(self.part_path, 'r+b' if os.path.exists(self.part_path) else 'w+b') as part_file:
+            # จองพื้นที่ไฟล์ไว้ก่อน แล้วเขียนแต่ละช่วงลงตำแหน่งของมันเอง
+            part_file.truncate(self.size)
+            missing = [i for i in range(part_count) if i not in self.done]
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                futures = {executor.submit(self.scheduler.call, self._fetch_range, part_file, i): i for i in missing}
+                errors = []
+                for future in as_completed(futures):
+                    if future.cancelled():
+                        continue
+                    # บันทึกช่วงที่สำเร็จให้ครบก่อน แม้บางช่วงจะล้มเหลว; ช่วงที่ยังไม่เริ่มไม่ต้องส่ง request อีก
+                    if future.exception():
+                        errors.append(future.exception())
+                        for pending in futures:
+                            pending.cancel()
+                        continue
+                    index = futures[future]
+                    with self.lock:
+                        self.done.add(index)
+                        part_file.flush()
+                        os.fsync(part_file.fileno())
+                        self._save_state()
+            if errors:
+                raise errors[0]
+
+        os.replace(self.part_path, self.local_path)
+        os.remove(self.state_path)
+
+    def _range(self, index):
+        offset = index * self.part_size
+        return offset, min(self.part_size, self.size - offset)
+
+    def _fetch_range(self, part_file, index):
+        offset, length = self._range(index)
+        with RequestTimer("get_range", self.bucket_name, self.object_name, self.scheduler.attempt()) as timer:
+            response = self.client.get_object(self.bucket_name, self.object_name, offset=offset, length=length)
+            timer.first_byte()
+            position = offset
+            try:
+                for chunk in response.stream(1024 * 1024):
+                    self._write_at(part_file, chunk, position)
+                    position += len(chunk)
+                    timer.add(len(chunk))
+                    self.scheduler.record(len(chunk))
+                    if self.throttle:
+                        self.throttle(len(chunk))
+                    if self.progress:
+                        self.progress(len(chunk))
+            except Exception:
+                # ช่วงนี้จะถูกดาวน์โหลดใหม่ทั้งช่วงเมื่อ retry จึงหักไบต์ที่นับไปแล้วออก
+                if self.progress and position > offset:
+                    self.progress(offset - position)
+                raise
+            finally:
+                response.close()
+                response.release_conn()
+            if position - offset != length:
+                raise IOError(f"Short read for range {offset}-{offset + length - 1}: got {position - offset} bytes")
+
+    def _write_at(self, part_file, data, position):
+        with registry.timer("local_write_seconds"):
+            if hasattr(os, 'pwrite'):
+                os.pwrite(part_file.fileno(), data, position)
+            else:
+                # Windows ไม่มี os.pwrite จึงใช้ seek + write ภายใต้ lock แทน
+                with self.lock:
+                    part_file.seek(position)
+                    part_file.write(data)
+        registry.inc("local_write_bytes", len(data))
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, 'r') as state_file:
+                state = json.load(state_file)
+        except (OSError, ValueError):
+            return set()
+        # ถ้า object เปลี่ยนไปตั้งแต่ครั้งก่อน ต้องเริ่มใหม่ทั้งหมด
+        if (state.get("size"), state.get("etag"), state.get("part_size")) != (self.size, self.etag, self.part_size):
+            return set()
+        return set(state.get("done", []))
+
+    def _save_state(self):
+        state = {
+            "size": self.size,
+            "etag": self.etag,
+            "part_size": self.part_size,
+            "done": sorted(self.done)
+        }
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, 'w') as state_file:
+            json.dump(state, state_file)
+        os.replace(tmp_path, self.state_path)
+
+
+class SyncManifest:
+    """SQLite record of the objects this tool has transferred.
+
+    Each row remembers the remote size, ETag and last-modified time together
+    with the local path and mtime, so a sync can skip anything unchanged.
+    ``seen`` is the latest time the object was known to exist on the server,
+    either recorded here or found by a listing, which lets a mirror delete
+    find vanished objects without asking the server about each one.
+    """
+
+    def __init__(self, path, endpoint):
+        self.endpoint = endpoint
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS manifest ("
+                " endpoint TEXT, bucket TEXT, key TEXT,"
+                " size INTEGER, etag TEXT, last_modified TEXT,"
+                " local_path TEXT, local_mtime REAL,"
+                " PRIMARY KEY (endpoint, bucket, key))"
+            )
+            columns = [row[1] for row in self.conn.execute("PRAGMA table_info(manifest)")]
+            if "seen" not in columns:
+                self.conn.execute("ALTER TABLE manifest ADD COLUMN seen REAL")
+
+    def get(self, bucket_name, object_name):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT size, etag, last_modified, local_path, local_mtime FROM manifest"
+                " WHERE endpoint = ? AND bucket = ? AND key = ?",
+                (self.endpoint, bucket_name, object_name)
+            ).fetchone()
+
+    def record(self, bucket_name, object_name, size, etag, last_modified, local_path):
+        local_mtime = os.path.getmtime(local_path)
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO manifest (endpoint, bucket, key, size, etag, last_modified,"
+                " local_path, local_mtime, seen) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.endpoint, bucket_name, object_name, size, etag, last_modified, local_path, local_mtime,
+                 time.time())
+            )
+
+    def mark_seen(self, bucket_name, object_names, run):
+        """Note that a listing started at ``run`` (a timestamp) found ``object_names``."""
+        with self.lock, self.conn:
+            # ใช้ค่ามากสุด เพื่อให้ listing ของงานอื่นที่ทำพร้อมกันไม่ทับค่าที่ใหม่กว่า
+            self.conn.executemany(
+                "UPDATE manifest SET seen = MAX(COALESCE(seen, 0), ?) WHERE endpoint = ? AND bucket = ? AND key = ?",
+                ((run, self.endpoint, bucket_name, object_name) for object_name in object_names)
+            )
+
+    def remove(self, bucket_name, object_name):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "DELETE FROM manifest WHERE endpoint = ? AND bucket = ? AND key = ?",
+                (self.endpoint, bucket_name, object_name)
+            )
+
+    def keys_under(self, bucket_name, prefix, seen_before=None):
+        """Keys under ``prefix`` with their local paths, optionally only those not seen since ``seen_before``."""
+        # ใช้ช่วงของ key แทน LIKE เพื่อให้ใช้ primary key index ได้
+        query = "SELECT key, local_path FROM manifest WHERE endpoint = ? AND bucket = ? AND key >= ?"
+        params = (self.endpoint, bucket_name, prefix)
+        end = prefix_end(prefix)
+        if end is not None:
+            query += " AND key < ?"
+            params += (end,)
+        if seen_before is not None:
+            query += " AND COALESCE(seen, 0) < ?"
+            params += (seen_before,)
+        with self.lock:
+            return self.conn.execute(query, params).fetchall()
+
+    def is_unchanged(self, bucket_name, object_name, size, etag, local_path):
+        entry = self.get(bucket_name, object_name)
+        if entry is None:
+            return False
+        entry_size, entry_etag, _, entry_local_path, entry_mtime = entry
+        if (entry_size, entry_etag, entry_local_path) != (size, etag, local_path):
+            return False
+        try:
+            return os.path.getsize(local_path) == size and os.path.getmtime(local_path) == entry_mtime
+        except OSError:
+            return False
+
+    def is_local_unchanged(self, bucket_name, object_name, local_path):
+        entry = self.get(bucket_name, object_name)
+        if entry is None:
+            return False
+        entry_size, _, _, entry_local_path, entry_mtime = entry
+        try:
+            return (entry_local_path == local_path
+                    and os.path.getsize(local_path) == entry_size
+                    and os.path.getmtime(local_path) == entry_mtime)
+        except OSError:
+            return False
+
+
+class ThrottledReader:
+    """File wrapper that charges every read against a ``throttle(nbytes)`` callable."""
+
+    def __init__(self, source, throttle):
+        self.source = source
+        self.throttle = throttle
+
+    def read(self, size=-1):
+        data = self.source.read(size)
+        if data:
+            self.throttle(len(data))
+        return data
+
+
+class UploadPipeline:
+    """Bounded-memory upload of a local directory tree.
+
+    A producer thread walks the tree lazily and feeds a bounded queue that a
+    fixed pool of consumer threads uploads from, so memory stays flat no
+    matter how many files the tree holds. Large files are sent as multipart
+    uploads whose parts are uploaded in parallel. With ``snowball_threshold``
+    set, smaller files are collected per consumer and sent as one tar that
+    the server extracts (``upload_snowball_objects``), at most
+    ``snowball_batch_size`` bytes or ``snowball_batch_files`` files at a time.
+    With ``compression`` (``gzip`` or ``zstd``) files that sample as
+    compressible are compressed while they stream.
+    """
+
+    def __init__(self, client, bucket_name, folder_to_upload, object_prefix,
+                 workers=UPLOAD_WORKERS, part_workers=UPLOAD_PART_WORKERS, on_event=None,
+                 manifest=None, sync=False, mirror_delete=False, progress=None, scheduler=None,
+                 snowball_threshold=0, snowball_batch_size=SNOWBALL_BATCH_SIZE,
+                 snowball_batch_files=SNOWBALL_BATCH_FILES, compression=None, throttle=None):
+        self.client = client
+        self.bucket_name = bucket_name
+        self.folder_to_upload = folder_to_upload
+        self.object_prefix = object_prefix
+        self.workers = workers
+        self.part_workers = part_workers
+        self.on_event = on_event
+        self.manifest = manifest
+        self.sync = sync
+        self.mirror_delete = mirror_delete
+        self.progress = progress
+        self.scheduler = scheduler or TransferScheduler()
+        self.snowball_threshold = snowball_threshold
+        self.snowball_batch_size = snowball_batch_size
+        self.snowball_batch_files = snowball_batch_files
+        self.compression = compression
+        self.throttle = throttle
+        self.tasks = queue.Queue(maxsize=workers * UPLOAD_QUEUE_FACTOR)
+        self.lock = threading.Lock()
+        self.uploaded = 0
+        self.skipped = 0
+        self.failed = 0
+        self.deleted = 0
+        self.walk_error = None
+
+    def run(self):
+        if not os.path.isdir(self.folder_to_upload):
+            raise NotADirectoryError(f"Not a folder: {self.folder_to_upload}")
+        consumers = [threading.Thread(target=self._consume, daemon=True) for _ in range(self.workers)]
+        for consumer in consumers:
+            consumer.start()
+        self._produce()
+        for consumer in consumers:
+            consumer.join()
+        if self.walk_error:
+            raise self.walk_error
+        if self.mirror_delete:
+            if self.failed:
+                # ถ้าอ่านโฟลเดอร์หรืออัปโหลดไม่ครบ จะไม่รู้แน่ว่าไฟล์ใดหายไปจริง จึงไม่ลบอะไรบน server
+                self._emit({"event": "error", "action": "mirror delete", "bucket": self.bucket_name,
+                            "key": self.object_prefix, "message": "Skipped because some files failed"})
+            else:
+                self._delete_missing()
+        return self.uploaded, self.failed
+
+    def iter_files(self):
+        for root, dirs, files in os.walk(self.folder_to_upload, onerror=self._walk_failed):
+            # ตรวจสอบและปรับชื่อโฟลเดอร์
+            adjusted_dirs = [d.replace('__', ':') for d in dirs]
+            for original, adjusted in zip(dirs, adjusted_dirs):
+                if original != adjusted:
+                    os.rename(os.path.join(root, original), os.path.join(root, adjusted))
+            dirs[:] = adjusted_dirs  # อัปเดตชื่อในโครงสร้าง os.walk
+
+            for file_name in files:
+                # ตรวจสอบและปรับชื่อไฟล์
+                adjusted_file_name = file_name.replace('__', ':')
+                if file_name != adjusted_file_name:
+                    os.rename(
+                        os.path.join(root, file_name),
+                        os.path.join(root, adjusted_file_name)
+                    )
+                file_path = os.path.join(root, adjusted_file_name)
+                relative_path = os.path.relpath(file_path, self.folder_to_upload).replace(os.sep, '/')
+                yield f"{self.object_prefix}/{relative_path}".lstrip('/'), file_path
+
+    def _walk_failed(self, error):
+        with self.lock:
+            self.failed += 1
+        self._emit({"event": "error", "action": "read", "bucket": self.bucket_name,
+                    "key": error.filename, "message": str(error)})
+
+    def _produce(self):
+        try:
+            # put() จะรอเมื่อคิวเต็ม จึงเดินโฟลเดอร์ได้เร็วเท่าที่อัปโหลดทัน
+            for task in self.iter_files():
+                self.tasks.put(task)
+                if self.progress:
+                    self.progress.add_files()
+        except Exception as e:
+            self.walk_error = e
+        finally:
+            for _ in range(self.workers):
+                self.tasks.put(None)
+
+    def _consume(self):
+        batch, batch_bytes = [], 0
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                break
+            object_name, file_path = task
+            event = {"bucket": self.bucket_name, "key": object_name}
+            try:
+                if self.sync and self.manifest.is_local_unchanged(self.bucket_name, object_name, file_path):
+                    event["event"] = "skipped"
+                else:
+                    size = os.path.getsize(file_path)
+                    if size < self.snowball_threshold:
+                        batch.append((object_name, file_path, size))
+                        batch_bytes += size
+                        if batch_bytes >= self.snowball_batch_size or len(batch) >= self.snowball_batch_files:
+                            self._upload_batch(batch)
+                            batch, batch_bytes = [], 0
+                        continue
+                    event.update(event="uploaded", bytes=self.scheduler.call(self.upload_file, object_name, file_path))
+            except Exception as e:
+                event.update(event="error", action="upload", message=str(e))
+            self._finish(event)
+        if batch:
+            self._upload_batch(batch)
+
+    def _finish(self, event):
+        with self.lock:
+            if event["event"] == "uploaded":
+                self.uploaded += 1
+            elif event["event"] == "skipped":
+                self.skipped += 1
+            else:
+                self.failed += 1
+        if self.progress:
+            self.progress.finish(event["key"])
+        self._emit(event)
+
+    def _emit(self, event):
+        if self.on_event:
+            self.on_event(event)
+
+    def upload_file(self, object_name, file_path):
+        size = os.path.getsize(file_path)
+        if self.compression and is_compressible(file_path, size):
+            return self._upload_compressed(object_name, file_path, size)
+        with open(file_path, 'rb') as file_data, \
+                RequestTimer("put_object", self.bucket_name, object_name, self.scheduler.attempt()) as timer:
+            result = self.client.put_object(
+                bucket_name=self.bucket_name,
+                object_name=object_name,
+                data=ThrottledReader(file_data, self.throttle) if self.throttle else file_data,
+                length=size,
+                part_size=UPLOAD_PART_SIZE,
+                progress=MinioProgress(self.progress) if self.progress else None,
+                num_parallel_uploads=self.part_workers if size > UPLOAD_PART_SIZE else 1
+            )
+            timer.add(size)
+        if self.manifest:
+            last_modified = result.last_modified.isoformat() if result.last_modified else None
+            self.manifest.record(self.bucket_name, object_name, size, result.etag, last_modified, file_path)
+        self.scheduler.record(size)
+        return size
+
+    def _upload_compressed(self, object_name, file_path, size):
+        on_read = None
+        if self.progress:
+            self.progress.start(object_name, size)
+            on_read = lambda nbytes: self.progress.advance(object_name, nbytes)
+        with open(file_path, 'rb') as file_data, \
+                RequestTimer("put_object", self.bucket_name, object_name, self.scheduler.attempt()) as timer:
+            reader = CompressingReader(file_data, self.compression, on_read)
+            # ไม่รู้ขนาดหลังบีบอัดล่วงหน้า จึงส่งแบบ length=-1 ซึ่ง minio-py แบ่งเป็น multipart ให้
+            result = self.client.put_object(
+                bucket_name=self.bucket_name,
+                object_name=object_name,
+                data=ThrottledReader(reader, self.throttle) if self.throttle else reader,
+                length=-1,
+                part_size=UPLOAD_PART_SIZE,
+                metadata=metadata_for(self.compression, size),
+                num_parallel_uploads=self.part_workers if size > UPLOAD_PART_SIZE else 1
+            )
+            timer.add(reader.written)
+        if self.manifest:
+            last_modified = result.last_modified.isoformat() if result.last_modified else None
+            self.manifest.record(self.bucket_name, object_name, size, result.etag, last_modified, file_path)
+        self.scheduler.record(reader.written)
+        return size
+
+    def _upload_batch(self, batch):
+        if self.progress:
+            for object_name, _, size in batch:
+                self.progress.start(object_name, size)
+        objects = [SnowballObject(object_name, filename=file_path) for object_name, file_path, _ in batch]
+        nbytes = sum(size for _, _, size in batch)
+        try:
+            # minio-py อ่านไฟล์เองตอนสร้าง tar จึงอ่านผ่าน ThrottledReader ไม่ได้; คิดแบนด์วิดท์ทั้ง batch ก่อนส่ง
+            if self.throttle:
+                self.throttle(nbytes)
+            self.scheduler.call(self._put_snowball, objects, nbytes)
+            error = None
+        except Exception as e:
+            error = e
+        for object_name, file_path, size in batch:
+            event = {"bucket": self.bucket_name, "key": object_name}
+            if error is None:
+                event.update(event="uploaded", bytes=size)
+                if self.manifest:
+                    # server ไม่คืน ETag ของแต่ละไฟล์ใน tar; การ sync ขาลงจึงจะดาวน์โหลดไฟล์นี้ใหม่หนึ่งครั้ง
+                    self.manifest.record(self.bucket_name, object_name, size, None, None, file_path)
+                if self.progress:
+                    self.progress.advance(object_name, size)
+            else:
+                event.update(event="error", action="upload", message=str(error))
+            self._finish(event)
+        if error is None:
+            self.scheduler.record(nbytes)
+
+    def _put_snowball(self, objects, nbytes):
+        # สร้าง tar ในไฟล์ชั่วคราวแทนหน่วยความจำ เพราะ worker ทุกตัวอาจถือ batch ขนาด snowball_batch_size พร้อมกัน
+        fd, staging_path = tempfile.mkstemp(prefix="minio-snowball-", suffix=".tar")
+        os.close(fd)
+        try:
+            with RequestTimer("put_snowball", self.bucket_name, objects[0].object_name,
+                              self.scheduler.attempt()) as timer:
+                self.client.upload_snowball_objects(self.bucket_name, objects, staging_filename=staging_path,
+                                                    compression=bool(self.compression))
+                timer.add(nbytes)
+        finally:
+            os.remove(staging_path)
+
+    def _delete_missing(self):
+        # ลบ object ที่ไม่มีไฟล์ต้นทางแล้ว โดยตรวจทีละ key แทนการเก็บรายชื่อไฟล์ทั้งหมดไว้ในหน่วยความจำ
+        prefix = f"{self.object_prefix}/".lstrip('/')
+
+        def missing_objects():
+            objects = self.client.list_objects(self.bucket_name, prefix=prefix, recursive=True)
+            for obj in timed_listing(objects, self.bucket_name, prefix):
+                relative_path = obj.object_name[len(prefix):]
+                if not os.path.exists(os.path.join(self.folder_to_upload, *relative_path.split('/'))):
+                    with self.lock:
+                        self.deleted += 1
+                    if self.manifest:
+                        self.manifest.remove(self.bucket_name, obj.object_name)
+                    self._emit({"event": "deleted", "bucket": self.bucket_name, "key": obj.object_name})
+                    yield DeleteObject(obj.object_name)
+
+        for error in self.client.remove_objects(self.bucket_name, missing_objects()):
+            with self.lock:
+                self.failed += 1
+            self._emit({"event": "error", "action": "delete", "bucket": self.bucket_name,
+                        "key": error.name, "message": error.message})
+
+
+class TransferEngine:
+    """Download, upload and sync driver with no GUI dependencies.
+
+    Every finished, skipped or failed transfer is reported to ``on_event`` as
+    a dict; the GUI turns those into log lines and the CLI prints them as
+    JSON lines.
+    """
+
+    def __init__(self, client, manifest=None, progress=None, on_event=None, scheduler=None, throttles=()):
+        self.client = client
+        self.manifest = manifest
+        self.progress = progress
+        self.on_event = on_event
+        self.scheduler = scheduler or TransferScheduler()
+        # ตัวจำกัดแบนด์วิดท์ (มีเมธอด consume) ที่ทุก chunk ต้องผ่าน เช่น ของทั้งแอปและของแต่ละงาน
+        self.throttles = tuple(throttles)
+        self.throttle = self._throttle if self.throttles else None
+        self.lock = threading.Lock()
+
+    def emit(self, event):
+        if self.on_event:
+            self.on_event(event)
+
+    def _throttle(self, nbytes):
+        for throttle in self.throttles:
+            throttle.consume(nbytes)
+
+    def iter_objects(self, bucket_name, prefix='', run=None, sizes=False):
+        """Yield ``bucket/key`` for every object under ``prefix``.
+
+        With ``sizes`` each entry is a ``(bucket/key, size)`` pair as accepted
+        by ``download``. With ``run`` (the listing's start time) every listed
+        key is marked seen in the manifest for a later ``delete_local_mirror``.
+        """
+        objects = self.client.list_objects(bucket_name, prefix=prefix, recursive=True)
+        seen = []
+        for obj in timed_listing(objects, bucket_name, prefix):
+            if obj.is_dir:
+                continue
+            if run is not None:
+                seen.append(obj.object_name)
+                if len(seen) >= SEEN_BATCH_SIZE:
+                    self.manifest.mark_seen(bucket_name, seen, run)
+                    seen = []
+            file_path = f"{bucket_name}/{obj.object_name}"
+            yield (file_path, obj.size) if sizes else file_path
+        if seen:
+            self.manifest.mark_seen(bucket_name, seen, run)
+
+    def download(self, file_paths, output_folder, sync=False, workers=DOWNLOAD_WORKERS):
+        """Download ``bucket/key`` paths; return a dict of event counts.
+
+        ``file_paths`` may be a lazy iterator; only a bounded window of it is
+        held in memory at a time. Entries may also be ``(bucket/key, size)``
+        pairs, which lets small objects skip the HEAD request.
+        """
+        counts = {"downloaded": 0, "skipped": 0, "error": 0}
+
+        def download_item(item):
+            file_path, size = (item, None) if isinstance(item, str) else item
+            return self.download_file(file_path, output_folder, sync, size)
+
+        self._run_bounded(file_paths, download_item, counts, workers)
+        return counts
+
+    def _run_bounded(self, items, handle, counts, workers):
+        # คิวมีขนาดจำกัด ผู้ผลิตจึงรอ consumer และไม่ต้องเก็บรายการทั้งหมดไว้ในหน่วยความจำ
+        tasks = queue.Queue(maxsize=workers * UPLOAD_QUEUE_FACTOR)
+
+        def consume():
+            while True:
+                item = tasks.get()
+                if item is None:
+                    return
+                event = handle(item)
+                with self.lock:
+                    counts[event["event"]] += 1
+                self.emit(event)
+
+        consumers = [threading.Thread(target=consume, daemon=True) for _ in range(workers)]
+        for consumer in consumers:
+            consumer.start()
+        try:
+            for item in items:
+                tasks.put(item)
+        finally:
+            for _ in consumers:
+                tasks.put(None)
+            for consumer in consumers:
+                consumer.join()
+
+    def download_file(self, file_path, output_folder, sync=False, size=None):
+        """Download one object; ``size`` from a listing, if known, saves a HEAD for small objects."""
+        bucket_name, _, object_name = file_path.partition('/')
+        event = {"bucket": bucket_name, "key": object_name}
+        try:
+            if not object_name:
+                raise ValueError(f"Invalid file path: {file_path}")
+            local_path = local_path_for(output_folder, object_name)
+            event["bytes"] = self._download_object(bucket_name, object_name, local_path, sync, size)
+            event.update(event="downloaded" if event["bytes"] is not None else "skipped", path=local_path)
+        except Exception as e:
+            event.update(event="error", action="download", message=str(e))
+            if self.progress:
+                # ไบต์ที่นับไปแล้วของ object นี้ไม่ได้ลงไฟล์จริง (หรือจะถูกนับใหม่ตอน resume)
+                self.progress.rollback(object_name)
+        finally:
+            if self.progress:
+                self.progress.finish(object_name)
+        return event
+
+    def _download_object(self, bucket_name, object_name, local_path, sync, size_hint=None):
+        local_dir = os.path.dirname(local_path)
+        if not os.path.exists(local_dir):
+            os.makedirs(local_dir, exist_ok=True)
+
+        stat = None
+        if sync:
+            stat = self.scheduler.call(self.client.stat_object, bucket_name, object_name)
+            size = original_size_of(stat.metadata, stat.size)
+            if self.manifest.is_unchanged(bucket_name, object_name, size, stat.etag, local_path):
+                return None
+        elif size_hint is None or size_hint >= RANGED_DOWNLOAD_THRESHOLD:
+            # เลือกวิธีดาวน์โหลดจาก HEAD แทนการเปิด GET ทั้ง object แล้วปิดทิ้งเมื่อพบว่าใหญ่
+            stat = self.scheduler.call(self.client.stat_object, bucket_name, object_name)
+
+        if stat is None or stat.size < RANGED_DOWNLOAD_THRESHOLD:
+            size, etag, last_modified = self.scheduler.call(self._stream_object, bucket_name, object_name, local_path)
+        else:
+            # object ใหญ่: ดาวน์โหลดแบบแบ่งช่วง
+            stored_size, etag = stat.size, stat.etag
+            size = original_size_of(stat.metadata, stored_size)
+            last_modified = stat.last_modified.isoformat() if stat.last_modified else None
+            codec = codec_of(stat.metadata)
+            progress = None
+            if self.progress:
+                self.progress.start(object_name, stored_size)
+                progress = lambda nbytes: self.progress.advance(object_name, nbytes)
+            # object ที่บีบอัดไว้ดาวน์โหลดแบบแบ่งช่วงลงไฟล์ชั่วคราวก่อน แล้วจึงคลายทีเดียว
+            target_path = f"{local_path}.{codec}" if codec else local_path
+            RangedDownload(
+                self.client, bucket_name, object_name, target_path, stored_size, etag,
+                progress=progress, scheduler=self.scheduler, throttle=self.throttle
+            ).run()
+            if codec:
+                decompress_file(target_path, f"{local_path}.part", codec)
+                os.replace(f"{local_path}.part", local_path)
+                os.remove(target_path)
+
+        if self.manifest:
+            self.manifest.record(bucket_name, object_name, size, etag, last_modified, local_path)
+        return size
+
+    def _stream_object(self, bucket_name, object_name, local_path):
+        with RequestTimer("get_object", bucket_name, object_name, self.scheduler.attempt()) as timer:
+            response = self.client.get_object(bucket_name, object_name)
+            timer.first_byte()
+            try:
+                size = int(response.headers.get('Content-Length', 0))
+                etag = response.headers.get('ETag', '').strip('"')
+                last_modified = response.headers.get('Last-Modified')
+                if last_modified:
+                    last_modified = parsedate_to_datetime(last_modified).isoformat()
+                codec = codec_of(response.headers)
+                original_size = original_size_of(response.headers, size)
+                if self.progress:
+                    self.progress.start(object_name, size)
+
+                decompressor = Decompressor(codec) if codec else None
+                advanced = 0
+                file_data = open(local_path, 'wb')
+                try:
+                    with file_data:
+                        for chunk in response.stream(DOWNLOAD_CHUNK_SIZE):
+                            timer.add(len(chunk))
+                            self.scheduler.record(len(chunk))
+                            if self.throttle:
+                                self.throttle(len(chunk))
+                            if self.progress:
+                                self.progress.advance(object_name, len(chunk))
+                                advanced += len(chunk)
+                            data = decompressor.decompress(chunk) if decompressor else chunk
+                            with registry.timer("local_write_seconds"):
+                                file_data.write(data)
+                            registry.inc("local_write_bytes", len(data))
+                        if decompressor:
+                            file_data.write(decompressor.flush())
+                except Exception:
+                    # ไฟล์เดิมถูกเขียนทับไปแล้ว จึงลบไฟล์ที่เขียนไม่ครบทิ้ง ไม่ให้ดูเหมือนดาวน์โหลดสำเร็จ
+                    os.remove(local_path)
+                    if advanced:
+                        # scheduler อาจ retry ซึ่งจะเริ่มนับจากศูนย์อีกครั้ง
+                        self.progress.advance(object_name, -advanced)
+                    raise
+                return original_size, etag, last_modified
+            finally:
+                response.close()
+                response.release_conn()
+
+    def copy(self, src_bucket, src_key, dst_bucket, dst_key, move=False, workers=COPY_WORKERS):
+        """Copy or move objects on the server; return a dict of event counts.
+
+        ``src_key`` is one object, or a prefix when it is empty or ends with
+        ``/``; every object under a prefix is copied to ``dst_key`` plus the
+        rest of its key. No object data passes through the client. With
+        ``move`` the sources are deleted once their copy has succeeded.
+        """
+        is_prefix = not src_key or src_key.endswith('/')
+        if is_prefix and dst_key and not dst_key.endswith('/'):
+            dst_key += '/'
+        if src_bucket == dst_bucket and (dst_key == src_key or (is_prefix and dst_key.startswith(src_key))):
+            raise ValueError("Destination must not be the source or lie inside it")
+
+        def tasks():
+            if not is_prefix:
+                yield src_key, dst_key, None
+                return
+            # listing แบบ recursive ไม่มี common prefix; is_dir ในที่นี้คือ folder marker ซึ่งต้องคัดลอกไปด้วย
+            for obj in timed_listing(self.client.list_objects(src_bucket, prefix=src_key, recursive=True), src_bucket, src_key):
+                if self.progress:
+                    self.progress.add_files()
+                yield obj.object_name, dst_key + obj.object_name[len(src_key):], obj.size
+
+        counts = {"moved" if move else "copied": 0, "error": 0}
+        # รายการลบของการเรียกครั้งนี้เท่านั้น engine เดียวจึง copy หลายงานพร้อมกันได้
+        pending_deletes = []
+        delete_errors = 0
+
+        def copy_task(task):
+            nonlocal delete_errors
+            event = self.copy_object(src_bucket, dst_bucket, *task, move=move)
+            if move and event["event"] == "moved":
+                with self.lock:
+                    pending_deletes.append(DeleteObject(task[0]))
+                    if len(pending_deletes) < DELETE_BATCH_SIZE:
+                        return event
+                    batch = pending_deletes[:]
+                    del pending_deletes[:]
+                errors = self._remove_batch(src_bucket, batch)
+                with self.lock:
+                    delete_errors += errors
+            return event
+
+        if self.progress and not is_prefix:
+            self.progress.add_files()
+        self._run_bounded(tasks(), copy_task, counts, workers)
+        if move and pending_deletes:
+            delete_errors += self._remove_batch(src_bucket, pending_deletes)
+        counts["error"] += delete_errors
+        return counts
+
+    def copy_object(self, src_bucket, dst_bucket, src_key, dst_key, size=None, move=False):
+        """Copy one object on the server and return its event; ``copy`` deletes the sources of a move."""
+        event = {"bucket": dst_bucket, "key": dst_key, "source": f"{src_bucket}/{src_key}"}
+        try:
+            stat = None
+            if size is None:
+                # object เดียว (copy, move, rename) ยังไม่รู้ขนาด; minio-py จะ compose เองโดยไม่ส่ง metadata ต่อ
+                stat = self.scheduler.call(self.client.stat_object, src_bucket, src_key)
+                size = stat.size
+            if self.progress:
+                self.progress.start(src_key, size)
+            if size > SERVER_COPY_LIMIT:
+                # multipart copy สร้าง object ใหม่โดยไม่มี metadata ของต้นทาง จึงต้องส่งต่อเอง
+                if stat is None:
+                    stat = self.scheduler.call(self.client.stat_object, src_bucket, src_key)
+                self.scheduler.call(self.client.compose_object, dst_bucket, dst_key,
+                                    [ComposeSource(src_bucket, src_key)], metadata=source_metadata(stat.metadata))
+            else:
+                self.scheduler.call(self.client.copy_object, dst_bucket, dst_key, CopySource(src_bucket, src_key))
+            if size:
+                self.scheduler.record(size)
+                if self.progress:
+                    self.progress.advance(src_key, size)
+            event.update(event="moved" if move else "copied", bytes=size)
+        except Exception as e:
+            event.update(event="error", action="move" if move else "copy", message=str(e))
+        finally:
+            if self.progress:
+                self.progress.finish(src_key)
+        return event
+
+    def _remove_batch(self, bucket_name, batch):
+        # ลบต้นทางเป็นชุดละไม่เกิน DELETE_BATCH_SIZE แทนการลบทีละ object; คืนจำนวนที่ลบไม่สำเร็จ
+        errors = 0
+        for error in self.client.remove_objects(bucket_name, batch):
+            errors += 1
+            self.emit({"event": "error", "action": "delete", "bucket": bucket_name,
+                       "key": error.name, "message": error.message})
+        return errors
+
+    def delete_local_mirror(self, bucket_name, prefix, run):
+        """Delete local copies of objects under ``prefix`` that are gone from the server.
+
+        ``run`` is the start time of a complete listing of ``prefix`` made
+        with ``iter_objects(..., run=run)``. Manifest entries that listing did
+        not find, and that were not downloaded since, are removed; no request
+        is sent per key.
+        """
+        deleted = 0
+        for object_name, local_path in self.manifest.keys_under(bucket_name, prefix, seen_before=run):
+            if os.path.exists(local_path):
+                os.remove(local_path)
+            self.manifest.remove(bucket_name, object_name)
+            deleted += 1
+            self.emit({"event": "deleted_local", "bucket": bucket_name, "key": object_name, "path": local_path})
+        return deleted
+
+    def upload_folder(self, bucket_name, folder_to_upload, object_prefix, workers=UPLOAD_WORKERS,
+                      sync=False, mirror_delete=False, snowball_threshold=0,
+                      snowball_batch_size=SNOWBALL_BATCH_SIZE, compression=None):
+        """Upload a local tree under ``object_prefix``; return the finished UploadPipeline."""
+        pipeline = UploadPipeline(
+            self.client,
+            bucket_name,
+            folder_to_upload,
+            object_prefix,
+            workers=workers,
+            on_event=self.emit,
+            manifest=self.manifest,
+            sync=sync,
+            mirror_delete=mirror_delete,
+            progress=self.progress,
+            scheduler=self.scheduler,
+            snowball_threshold=snowball_threshold,
+            snowball_batch_size=snowball_batch_size,
+            compression=compression,
+            throttle=self.throttle
+        )
+        pipeline.run()
+        return pipeline
@@ -0,0 +1,448 @@
+"""Persistent download queue with priorities, fairness and bandwidth limits."""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from .compression import CODECS
+from .engine import DOWNLOAD_WORKERS, TransferEngine, local_path_for
+from .metrics import timed_listing
+from .scheduler import TokenBucket
+
+QUEUE_PATH = "minio_queue.sqlite"
+# เวลาที่ worker รอเมื่อคิวว่าง ก่อนตรวจใหม่ (วินาที)
+QUEUE_IDLE_WAIT = 1.0
+# จำนวน object ที่บันทึกลงคิวต่อหนึ่ง transaction ตอนขยาย prefix
+QUEUE_INSERT_BATCH = 1000
+
+ACTIVE = "active"
+PAUSED = "paused"
+CANCELLED = "cancelled"
+DONE = "done"
+
+
+class TransferCancelled(Exception):
+    pass
+
+
+class TransferPaused(Exception):
+    pass
+
+
+class JobControl:
+    """Per-job bandwidth limit, pause and cancellation, checked on every chunk."""
+
+    def __init__(self, rate=0, stopped=None):
+        self.bandwidth = TokenBucket(rate)
+        self.paused = threading.Event()
+        self.cancelled = threading.Event()
+        self.stopped = stopped or threading.Event()
+        self.closed = False
+
+    def consume(self, nbytes):
+        if self.cancelled.is_set() or self.stopped.is_set():
+            raise TransferCancelled("Cancelled")
+        # ไม่รอตรงนี้ เพราะจะถือ slot ของ scheduler และ worker ไว้; ยกเลิก request แล้วนำกลับเข้าคิวแทน
+        if self.paused.is_set():
+            raise TransferPaused("Paused")
+        self.bandwidth.consume(nbytes)
+
+
+class TransferQueue:
+    """SQLite-backed queue of download jobs and their objects.
+
+    Each job holds its own priority, bandwidth limit and state, and the
+    prefixes still to be listed, so queued work survives a restart.
+    ``claim`` hands out the next object: highest priority first, buckets in
+    rotation so one busy bucket cannot starve the others, and the smallest
+    object of that bucket first so many small files finish quickly.
+    """
+
+    def __init__(self, path, endpoint):
+        self.endpoint = endpoint
+        self.lock = threading.Lock()
+        self.last_bucket = ''
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT, endpoint TEXT, label TEXT,"
+                " output_folder TEXT, sync INTEGER, mirror_delete INTEGER,"
+                " priority INTEGER, rate_limit INTEGER, state TEXT, created REAL,"
+                " pending_prefixes TEXT, folders TEXT,"
+                " total INTEGER DEFAULT 0, finished INTEGER DEFAULT 0, failed INTEGER DEFAULT 0)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS items ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT, job_id INTEGER, bucket TEXT, key TEXT,"
+                " size INTEGER, state TEXT, UNIQUE (job_id, bucket, key))"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS items_by_state ON items (job_id, state, bucket, size)")
+            # งานที่ค้างจากการปิดโปรแกรมครั้งก่อนจะถูกเริ่มใหม่
+            self.conn.execute(
+                "UPDATE items SET state = 'queued' WHERE state = 'running'"
+                " AND job_id IN (SELECT id FROM jobs WHERE endpoint = ?)",
+                (endpoint,)
+            )
+
+    def add_job(self, label, output_folder, files, prefixes, sync=False, mirror_delete=False,
+                priority=0, rate_limit=0):
+        """Queue ``files`` (``(bucket/key, size or None)``) and ``prefixes`` (``bucket/prefix/``); return the job id."""
+        # mirror delete ทำได้เฉพาะโฟลเดอร์ที่ถูก list ครบ ไม่ใช่โฟลเดอร์ของไฟล์ที่เลือกทีละไฟล์
+        folders = sorted(set(prefixes))
+        with self.lock, self.conn:
+            job_id = self.conn.execute(
+                "INSERT INTO jobs (endpoint, label, output_folder, sync, mirror_delete, priority, rate_limit,"
+                " state, created, pending_prefixes, folders) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.endpoint, label, output_folder, int(sync), int(mirror_delete), priority, rate_limit,
+                 ACTIVE, time.time(), json.dumps(list(prefixes)), json.dumps(folders))
+            ).lastrowid
+        self.add_items(job_id, ((*path.split('/', 1), size) for path, size in files))
+        return job_id
+
+    def add_items(self, job_id, items):
+        """Add ``(bucket, key, size)`` rows to a job; return how many were new."""
+        added = 0
+        with self.lock, self.conn:
+            # prefix ที่ยังขยายอยู่ตอนยกเลิกงานต้องไม่เพิ่มรายการเข้าไปอีก
+            state = self.conn.execute("SELECT state FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if state is None or state[0] == CANCELLED:
+                return 0
+            for bucket_name, object_name, size in items:
+                added += self.conn.execute(
+                    "INSERT OR IGNORE INTO items (job_id, bucket, key, size, state) VALUES (?, ?, ?, ?, 'queued')",
+                    (job_id, bucket_name, object_name, size)
+                ).rowcount
+            self.conn.execute("UPDATE jobs SET total = total + ? WHERE id = ?", (added, job_id))
+        return added
+
+    def prefix_listed(self, job_id, prefix):
+        with self.lock, self.conn:
+            row = self.conn.execute("SELECT pending_prefixes FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            pending = [p for p in json.loads(row[0]) if p != prefix] if row else []
+            self.conn.execute("UPDATE jobs SET pending_prefixes = ? WHERE id = ?", (json.dumps(pending), job_id))
+
+    def pending_prefixes(self):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, pending_prefixes FROM jobs WHERE endpoint = ? AND state IN (?, ?)",
+                (self.endpoint, ACTIVE, PAUSED)
+            ).fetchall()
+        return [(job_id, prefix) for job_id, pending in rows for prefix in json.loads(pending)]
+
+    def queued_count(self):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM items JOIN jobs ON items.job_id = jobs.id"
+                " WHERE jobs.endpoint = ? AND jobs.state IN (?, ?) AND items.state = 'queued'",
+                (self.endpoint, ACTIVE, PAUSED)
+            ).fetchone()[0]
+
+    def claim(self):
+        """Mark the next object as running and return ``(item_id, job_id, bucket, key, size)``, or None."""
+        with self.lock, self.conn:
+            jobs = self.conn.execute(
+                "SELECT id, priority FROM jobs WHERE endpoint = ? AND state = ? ORDER BY priority DESC, id",
+                (self.endpoint, ACTIVE)
+            ).fetchall()
+            for priority in sorted({priority for _, priority in jobs}, reverse=True):
+                job_ids = [job_id for job_id, job_priority in jobs if job_priority == priority]
+                bucket_name = self._next_bucket(job_ids, self.last_bucket) or self._next_bucket(job_ids, '')
+                if bucket_name is None:
+                    continue
+                # แต่ละงานมี index ของตัวเอง จึงหา object เล็กสุดทีละงานแล้วเลือกที่เล็กที่สุด
+                candidates = []
+                for job_id in job_ids:
+                    row = self.conn.execute(
+                        "SELECT id, job_id, bucket, key, size FROM items"
+                        " WHERE job_id = ? AND state = 'queued' AND bucket = ? ORDER BY size LIMIT 1",
+                        (job_id, bucket_name)
+                    ).fetchone()
+                    if row:
+                        candidates.append(row)
+                item = min(candidates, key=lambda row: row[4] or 0)
+                self.conn.execute("UPDATE items SET state = 'running' WHERE id = ?", (item[0],))
+                self.last_bucket = bucket_name
+                return item
+        return None
+
+    def _next_bucket(self, job_ids, after):
+        buckets = []
+        for job_id in job_ids:
+            row = self.conn.execute(
+                "SELECT bucket FROM items WHERE job_id = ? AND state = 'queued' AND bucket > ? ORDER BY bucket LIMIT 1",
+                (job_id, after)
+            ).fetchone()
+            if row:
+                buckets.append(row[0])
+        return min(buckets) if buckets else None
+
+    def add_failure(self, job_id):
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE jobs SET failed = failed + 1 WHERE id = ?", (job_id,))
+
+    def finish(self, item_id, job_id, state):
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE items SET state = ? WHERE id = ?", (state, item_id))
+            self.conn.execute(
+                "UPDATE jobs SET finished = finished + 1, failed = failed + ? WHERE id = ?",
+                (int(state == "error"), job_id)
+            )
+
+    def requeue(self, item_id):
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE items SET state = 'queued' WHERE id = ?", (item_id,))
+
+    def is_complete(self, job_id):
+        with self.lock:
+            row = self.conn.execute("SELECT pending_prefixes FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None or json.loads(row[0]):
+                return False
+            return self.conn.execute(
+                "SELECT 1 FROM items WHERE job_id = ? AND state IN ('queued', 'running') LIMIT 1", (job_id,)
+            ).fetchone() is None
+
+    def job(self, job_id):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT id, label, output_folder, sync, mirror_delete, priority, rate_limit, state,"
+                " folders, total, finished, failed, created FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        keys = ("id", "label", "output_folder", "sync", "mirror_delete", "priority", "rate_limit", "state",
+                "folders", "total", "finished", "failed", "created")
+        job = dict(zip(keys, row))
+        job["folders"] = json.loads(job["folders"])
+        return job
+
+    def jobs(self):
+        with self.lock:
+            job_ids = [row[0] for row in self.conn.execute(
+                "SELECT id FROM jobs WHERE endpoint = ? ORDER BY id", (self.endpoint,)
+            )]
+        return [self.job(job_id) for job_id in job_ids]
+
+    def set_state(self, job_id, state):
+        """Change a job's state; return how many queued objects a cancel dropped."""
+        cancelled = 0
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE jobs SET state = ? WHERE id = ?", (state, job_id))
+            if state == CANCELLED:
+                cancelled = self.conn.execute(
+                    "UPDATE items SET state = 'cancelled' WHERE job_id = ? AND state = 'queued'", (job_id,)
+                ).rowcount
+                self.conn.execute(
+                    "UPDATE jobs SET finished = finished + ?, pending_prefixes = '[]' WHERE id = ?",
+                    (cancelled, job_id)
+                )
+        return cancelled
+
+    def set_priority(self, job_id, priority):
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE jobs SET priority = ? WHERE id = ?", (priority, job_id))
+
+    def set_rate_limit(self, job_id, rate_limit):
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE jobs SET rate_limit = ? WHERE id = ?", (rate_limit, job_id))
+
+    def clear_finished(self):
+        with self.lock, self.conn:
+            job_ids = [(row[0],) for row in self.conn.execute(
+                "SELECT id FROM jobs WHERE endpoint = ? AND state IN (?, ?)", (self.endpoint, DONE, CANCELLED)
+            )]
+            self.conn.executemany("DELETE FROM items WHERE job_id = ?", job_ids)
+            self.conn.executemany("DELETE FROM jobs WHERE id = ?", job_ids)
+
+
+class QueueRunner:
+    """Worker threads that drain a TransferQueue.
+
+    ``bandwidth`` caps all transfers together and each job may add its own
+    cap; both can be changed while downloads run. Pausing a job stops new
+    objects from starting and puts the ones in flight back in the queue;
+    cancelling it aborts them.
+    """
+
+    def __init__(self, transfer_queue, client, manifest=None, progress=None, on_event=None,
+                 scheduler=None, workers=DOWNLOAD_WORKERS, rate=0):
+        self.queue = transfer_queue
+        self.client = client
+        self.manifest = manifest
+        self.progress = progress
+        self.on_event = on_event
+        self.scheduler = scheduler
+        self.workers = workers
+        self.bandwidth = TokenBucket(rate)
+        self.controls = {}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition()
+        self.stopped = threading.Event()
+
+    def start(self):
+        if self.progress:
+            self.progress.add_files(self.queue.queued_count())
+        for job_id, prefix in self.queue.pending_prefixes():
+            threading.Thread(target=self._expand, args=(job_id, prefix), daemon=True).start()
+        for _ in range(self.workers):
+            threading.Thread(target=self._work, daemon=True).start()
+
+    def stop(self):
+        # งานที่ค้างอยู่ยังเป็น 'running' ในฐานข้อมูล และจะดาวน์โหลดต่อเมื่อเปิดโปรแกรมครั้งหน้า
+        self.stopped.set()
+        self.notify()
+
+    def notify(self):
+        with self.wakeup:
+            self.wakeup.notify_all()
+
+    def submit(self, files, prefixes, output_folder, sync=False, mirror_delete=False, priority=0,
+               rate_limit=0, label=None):
+        label = label or (files[0][0] if len(files) == 1 and not prefixes else f"{len(files)} files, {len(prefixes)} folders")
+        job_id = self.queue.add_job(label, output_folder, files, prefixes, sync, mirror_delete, priority, rate_limit)
+        if self.progress:
+            self.progress.add_files(len(files))
+        for prefix in prefixes:
+            threading.Thread(target=self._expand, args=(job_id, prefix), daemon=True).start()
+        self.notify()
+        return job_id
+
+    def pause(self, job_id):
+        self.queue.set_state(job_id, PAUSED)
+        job = self.queue.job(job_id)
+        self._control(job_id, job["rate_limit"] if job else 0).paused.set()
+
+    def resume(self, job_id):
+        self.queue.set_state(job_id, ACTIVE)
+        self._control(job_id).paused.clear()
+        self.notify()
+
+    def cancel(self, job_id):
+        self._control(job_id).cancelled.set()
+        dropped = self.queue.set_state(job_id, CANCELLED)
+        if self.progress:
+            # ไฟล์ที่ยังไม่เริ่มถือว่าจบแล้ว เพื่อให้ตัวนับความคืบหน้าไม่ค้าง
+            for _ in range(dropped):
+                self.progress.finish(None)
+        self._finish_job_if_complete(job_id)
+
+    def set_rate_limit(self, job_id, rate):
+        self.queue.set_rate_limit(job_id, rate)
+        self._control(job_id, rate).bandwidth.set_rate(rate)
+
+    def _control(self, job_id, rate=0):
+        with self.lock:
+            control = self.controls.get(job_id)
+            if control is None:
+                control = self.controls[job_id] = JobControl(rate, self.stopped)
+            return control
+
+    def _expand(self, job_id, prefix):
+        bucket_name, _, object_prefix = prefix.partition('/')
+        job = self.queue.job(job_id)
+        # listing ของงาน mirror delete บันทึกว่าพบ key ใดบ้าง โดยใช้เวลาสร้างงานเป็นรอบของ listing
+        run = job["created"] if job and job["mirror_delete"] and self.manifest else None
+        try:
+            batch = []
+            objects = self.client.list_objects(bucket_name, prefix=object_prefix, recursive=True)
+            for obj in timed_listing(objects, bucket_name, object_prefix):
+                if obj.is_dir:
+                    continue
+                batch.append((bucket_name, obj.object_name, obj.size))
+                if len(batch) >= QUEUE_INSERT_BATCH:
+                    self._add_batch(job_id, batch, run)
+                    batch = []
+                    if self.stopped.is_set() or self._control(job_id).cancelled.is_set():
+                        return
+            self._add_batch(job_id, batch, run)
+            self.queue.prefix_listed(job_id, prefix)
+        except Exception as e:
+            self._emit({"event": "error", "action": "list", "bucket": bucket_name, "key": object_prefix,
+                        "message": str(e)})
+            self.queue.add_failure(job_id)
+            self.queue.prefix_listed(job_id, prefix)
+        self._finish_job_if_complete(job_id)
+
+    def _add_batch(self, job_id, batch, run=None):
+        if run is not None and batch:
+            self.manifest.mark_seen(batch[0][0], [object_name for _, object_name, _ in batch], run)
+        added = self.queue.add_items(job_id, batch)
+        if self.progress:
+            self.progress.add_files(added)
+        self.notify()
+
+    def _work(self):
+        while not self.stopped.is_set():
+            item = self.queue.claim()
+            if item is None:
+                with self.wakeup:
+                    self.wakeup.wait(QUEUE_IDLE_WAIT)
+                continue
+            item_id, job_id, bucket_name, object_name, size = item
+            job = self.queue.job(job_id)
+            if job is None:
+                # งานถูกยกเลิกแล้วลบด้วย clear_finished หลัง claim
+                if self.progress:
+                    self.progress.finish(None)
+                continue
+            control = self._control(job_id, job["rate_limit"])
+            engine = TransferEngine(self.client, manifest=self.manifest, progress=self.progress,
+                                    scheduler=self.scheduler, throttles=(self.bandwidth, control))
+            event = engine.download_file(f"{bucket_name}/{object_name}", job["output_folder"], bool(job["sync"]),
+                                         size)
+            if self.stopped.is_set() and event["event"] == "error":
+                return
+            if event["event"] == "error" and control.cancelled.is_set():
+                self._remove_partial(local_path_for(job["output_folder"], object_name))
+                self.queue.finish(item_id, job_id, "cancelled")
+            elif event["event"] == "error" and control.paused.is_set():
+                # เก็บ .part และ .part.ranges ไว้ ดาวน์โหลดแบบแบ่งช่วงจะทำต่อจากเดิมเมื่อ resume
+                self.queue.requeue(item_id)
+                if self.progress:
+                    self.progress.add_files()
+                continue
+            else:
+                self.queue.finish(item_id, job_id, event["event"])
+                self._emit(event)
+            self._finish_job_if_complete(job_id)
+
+    def _remove_partial(self, local_path):
+        # ไฟล์ปลายทางเองไม่ลบ: ถ้ายังอยู่แปลว่ายังไม่ถูกเขียนทับ (ดาวน์โหลดแบบแบ่งช่วงเขียนลง .part)
+        # ส่วนการดาวน์โหลดแบบ stream ลบไฟล์ที่เขียนไม่ครบเองแล้ว
+        for target in [local_path] + [f"{local_path}.{codec}" for codec in CODECS]:
+            for path in (f"{target}.part", f"{target}.part.ranges"):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def _finish_job_if_complete(self, job_id):
+        job = self.queue.job(job_id)
+        if job is None or job["state"] == DONE or not self.queue.is_complete(job_id):
+            return
+        control = self._control(job_id)
+        with self.lock:
+            # มีเพียง thread เดียวที่ปิดงานได้
+            if control.closed:
+                return
+            control.closed = True
+        deleted = 0
+        if job["mirror_delete"] and job["state"] != CANCELLED and self.manifest:
+            if job["failed"]:
+                # listing หรือการดาวน์โหลดบางส่วนล้มเหลว จึงไม่แน่ใจว่าไฟล์ใดถูกลบจาก server จริง
+                self._emit({"event": "error", "action": "mirror delete", "bucket": "", "key": job["label"],
+                            "message": "Skipped because some transfers failed"})
+            else:
+                engine = TransferEngine(self.client, manifest=self.manifest, on_event=self.on_event,
+                                        scheduler=self.scheduler)
+                for folder in job["folders"]:
+                    bucket_name, _, prefix = folder.partition('/')
+                    deleted += engine.delete_local_mirror(bucket_name, prefix, job["created"])
+        if job["state"] != CANCELLED:
+            self.queue.set_state(job_id, DONE)
+        self._emit({"event": "job_finished", "job": job_id, "label": job["label"], "state": job["state"],
+                    "total": job["total"], "failed": job["failed"], "deleted": deleted})
+
+    def _emit(self, event):
+        if self.on_event:
+            self.on_event(event)
@@ -0,0 +1,343 @@
+"""Hot-path instrumentation: counters, latency histograms, a trace log and a profiler.
+
+Every listing page, S3 request, tree update and local write is counted in
+``registry``, which renders the Prometheus text format. The outputs are all
+optional and chosen with ``Instrumentation``: a metrics file rewritten on an
+interval, a local HTTP endpoint, a JSON-lines trace of individual requests
+and a cProfile dump of every thread.
+"""
+import cProfile
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_PREFIX = "minio_manager"
+# ขอบเขตของ histogram (วินาที) ตั้งแต่การเขียนดิสก์ระดับมิลลิวินาทีจนถึงไฟล์ใหญ่หลายนาที
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+# S3 คืนผล list_objects หน้าละ 1000 key
+LIST_PAGE_SIZE = 1000
+METRICS_DUMP_INTERVAL = 10.0
+# endpoint เปิดเฉพาะในเครื่อง
+METRICS_HOST = "127.0.0.1"
+
+# ค่าเริ่มต้นของ CLI และ GUI มาจาก environment variable เหล่านี้
+ENV_EVENT_LOG = "MINIO_EVENT_LOG"
+ENV_METRICS_FILE = "MINIO_METRICS_FILE"
+ENV_METRICS_PORT = "MINIO_METRICS_PORT"
+ENV_PROFILE = "MINIO_PROFILE"
+
+
+def _labels_text(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+
+class Metrics:
+    """Thread-safe counters and latency histograms.
+
+    ``tracers`` are callables that receive one dict per traced operation;
+    with none registered, tracing costs nothing. ``collectors`` return
+    ``{name: value}`` gauges sampled when the metrics are rendered.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.tracers = []
+        self.collectors = []
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram[0][index] += 1
+                    break
+            histogram[1] += seconds
+            histogram[2] += 1
+
+    @contextmanager
+    def timer(self, name, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def trace(self, record):
+        if self.tracers:
+            record = dict(record, ts=time.time())
+            for tracer in self.tracers:
+                tracer(record)
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format."""
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self.histograms.items())
+        lines = []
+        typed = set()
+        for (name, labels), value in counters:
+            metric = f"{METRICS_PREFIX}_{name}_total"
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{_labels_text(labels)} {value}")
+        for (name, labels), (counts, total, count) in histograms:
+            metric = f"{METRICS_PREFIX}_{name}"
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{metric}_bucket{_labels_text(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{metric}_bucket{_labels_text(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{metric}_sum{_labels_text(labels)} {total}")
+            lines.append(f"{metric}_count{_labels_text(labels)} {count}")
+        for collector in self.collectors:
+            for name, value in sorted(collector().items()):
+                lines.append(f"# TYPE {METRICS_PREFIX}_{name} gauge")
+                lines.append(f"{METRICS_PREFIX}_{name} {value}")
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        # เขียนไฟล์ชั่วคราวแล้วแทนที่ เพื่อให้ตัวอ่าน (เช่น node_exporter textfile) ไม่เห็นไฟล์ครึ่ง ๆ
+        with open(f"{path}.tmp", 'w') as metrics_file:
+            metrics_file.write(self.render())
+        os.replace(f"{path}.tmp", path)
+
+
+registry = Metrics()
+
+
+class RequestTimer:
+    """Times one S3 request: time to first byte, total time, bytes and retry number."""
+
+    def __init__(self, operation, bucket_name, object_name, attempt=0, metrics=None):
+        self.metrics = metrics or registry
+        self.operation = operation
+        self.bucket_name = bucket_name
+        self.object_name = object_name
+        self.attempt = attempt
+        self.started = time.perf_counter()
+        self.ttfb = None
+        self.bytes = 0
+
+    def first_byte(self):
+        if self.ttfb is None:
+            self.ttfb = time.perf_counter() - self.started
+            self.metrics.observe("request_ttfb_seconds", self.ttfb, operation=self.operation)
+
+    def add(self, nbytes):
+        self.bytes += nbytes
+
+    def done(self, error=None):
+        seconds = time.perf_counter() - self.started
+        status = "ok" if error is None else "error"
+        self.metrics.observe("request_seconds", seconds, operation=self.operation)
+        self.metrics.inc("requests", operation=self.operation, status=status)
+        self.metrics.inc("request_bytes", self.bytes, operation=self.operation)
+        if self.attempt:
+            self.metrics.inc("request_retries", operation=self.operation)
+        record = {"trace": "request", "operation": self.operation, "bucket": self.bucket_name,
+                  "key": self.object_name, "attempt": self.attempt, "ttfb": self.ttfb,
+                  "seconds": seconds, "bytes": self.bytes, "status": status}
+        if error is not None:
+            record["error"] = str(error)
+        self.metrics.trace(record)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.done(exc)
+
+
+def timed_listing(objects, bucket_name, prefix='', page_size=LIST_PAGE_SIZE, metrics=None):
+    """Yield from a ``list_objects`` iterator, timing every page of ``page_size`` entries.
+
+    Only the time spent waiting on the iterator is counted, which is where
+    minio-py fetches and parses each page; the caller's own work is not.
+    """
+    metrics = metrics or registry
+    iterator = iter(objects)
+    waited, count, pages = 0.0, 0, 0
+    while True:
+        started = time.perf_counter()
+        try:
+            obj = next(iterator)
+        except StopIteration:
+            break
+        finally:
+            waited += time.perf_counter() - started
+        count += 1
+        if count == page_size:
+            _record_page(metrics, bucket_name, prefix, pages, count, waited)
+            waited, count, pages = 0.0, 0, pages + 1
+        yield obj
+    if count or not pages:
+        _record_page(metrics, bucket_name, prefix, pages, count, waited)
+
+
+def _record_page(metrics, bucket_name, prefix, page, count, seconds):
+    metrics.observe("list_page_seconds", seconds)
+    metrics.inc("listed_objects", count)
+    metrics.trace({"trace": "list_page", "bucket": bucket_name, "prefix": prefix, "page": page,
+                   "objects": count, "seconds": seconds})
+
+
+class TraceLog:
+    """Append-only JSON-lines file of traced operations, usable as a tracer."""
+
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.file = open(path, 'a', buffering=1)
+
+    def __call__(self, record):
+        line = json.dumps(record, default=str) + '\n'
+        with self.lock:
+            self.file.write(line)
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+class Profiler:
+    """cProfile of the calling thread and of every thread started afterwards.
+
+    On Python 3.12+ a single profiler already sees all threads, so the
+    per-thread profilers are skipped there.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.profiles = []
+
+    def start(self):
+        self._enable()
+        threading.setprofile(self._start_thread)
+
+    def _start_thread(self, frame, event, arg):
+        sys.setprofile(None)
+        self._enable()
+
+    def _enable(self):
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            return
+        with self.lock:
+            self.profiles.append(profile)
+
+    def stop(self):
+        threading.setprofile(None)
+        with self.lock:
+            profiles, self.profiles = self.profiles, []
+        if not profiles:
+            return
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        stats.dump_stats(self.path)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    metrics = registry
+
+    def do_GET(self):
+        body = self.metrics.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Instrumentation:
+    """The outputs turned on for one run of the GUI or the CLI.
+
+    ``event_log`` appends a JSON line per request and listing page,
+    ``metrics_file`` is rewritten every ``interval`` seconds, ``metrics_port``
+    serves ``/metrics`` on localhost and ``profile`` receives a pstats dump
+    when ``close`` is called. Arguments left as None fall back to the
+    MINIO_EVENT_LOG, MINIO_METRICS_FILE, MINIO_METRICS_PORT and MINIO_PROFILE
+    environment variables when ``from_env`` is used.
+    """
+
+    def __init__(self, event_log=None, metrics_file=None, metrics_port=None, profile=None,
+                 interval=METRICS_DUMP_INTERVAL, metrics=None):
+        self.metrics = metrics or registry
+        self.metrics_file = metrics_file
+        self.interval = interval
+        self.trace_log = TraceLog(event_log) if event_log else None
+        self.profiler = Profiler(profile) if profile else None
+        self.server = None
+        self.stopped = threading.Event()
+        if self.trace_log:
+            self.metrics.tracers.append(self.trace_log)
+        if self.profiler:
+            self.profiler.start()
+        if metrics_port:
+            handler = type("Handler", (MetricsHandler,), {"metrics": self.metrics})
+            try:
+                self.server = ThreadingHTTPServer((METRICS_HOST, int(metrics_port)), handler)
+            except Exception:
+                # ถอด tracer และหยุด profiler ที่เริ่มไปแล้ว ไม่ให้ค้างอยู่ใน registry
+                self.close()
+                raise
+            self.server.daemon_threads = True
+            threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        if metrics_file:
+            threading.Thread(target=self._dump_loop, daemon=True).start()
+
+    @classmethod
+    def from_env(cls, **overrides):
+        settings = {
+            "event_log": os.environ.get(ENV_EVENT_LOG),
+            "metrics_file": os.environ.get(ENV_METRICS_FILE),
+            "metrics_port": os.environ.get(ENV_METRICS_PORT),
+            "profile": os.environ.get(ENV_PROFILE),
+        }
+        settings.update((key, value) for key, value in overrides.items() if value is not None)
+        return cls(**settings)
+
+    def _dump_loop(self):
+        while not self.stopped.wait(self.interval):
+            self.metrics.write(self.metrics_file)
+
+    def close(self):
+        self.stopped.set()
+        if self.profiler:
+            self.profiler.stop()
+        if self.metrics_file:
+            self.metrics.write(self.metrics_file)
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+        if self.trace_log:
+            self.metrics.tracers.remove(self.trace_log)
+            self.trace_log.close()
@@ -0,0 +1,181 @@
+"""Adaptive request concurrency with retry and backoff."""
+import random
+import threading
+import time
+
+from minio.error import S3Error, ServerError
+from urllib3.exceptions import HTTPError
+
+# ขอบเขตของจำนวน request ที่ทำพร้อมกัน และค่าเริ่มต้น
+MIN_IN_FLIGHT = 1
+MAX_IN_FLIGHT = 64
+INITIAL_IN_FLIGHT = 8
+# ระยะเวลาที่ใช้วัด throughput ก่อนปรับจำนวน request (วินาที)
+ADJUST_WINDOW = 2.0
+
+RETRY_ATTEMPTS = 6
+RETRY_BASE_DELAY = 0.25
+RETRY_MAX_DELAY = 20.0
+RETRYABLE_CODES = {
+    "SlowDown", "SlowDownRead", "SlowDownWrite", "RequestTimeout", "RequestTimeTooSkewed",
+    "InternalError", "ServiceUnavailable", "XMinioServerNotInitialized",
+}
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# ปริมาณที่ส่งต่อเนื่องได้ก่อนถูกจำกัด คิดเป็นกี่วินาทีของอัตราที่ตั้งไว้
+TOKEN_BUCKET_BURST = 1.0
+
+
+def is_retryable(error):
+    """True for throttling, transient server errors and reset or timed-out connections."""
+    if isinstance(error, S3Error):
+        return error.code in RETRYABLE_CODES
+    if isinstance(error, ServerError):
+        return error.status_code in RETRYABLE_STATUS
+    return isinstance(error, (HTTPError, ConnectionError, TimeoutError))
+
+
+def backoff_delay(attempt, base=RETRY_BASE_DELAY, cap=RETRY_MAX_DELAY):
+    # exponential backoff แบบ full jitter เพื่อไม่ให้ทุก thread retry พร้อมกัน
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class TransferScheduler:
+    """AIMD limiter for in-flight S3 requests.
+
+    Each request runs inside a slot. At the end of every measuring window the
+    limit grows by one while throughput keeps improving and the limiter was
+    saturated, and it is halved (at most once per window) when the server
+    throttles or a connection fails. Throttled and reset requests are retried
+    with exponential backoff and jitter.
+    """
+
+    def __init__(self, initial=INITIAL_IN_FLIGHT, minimum=MIN_IN_FLIGHT, maximum=MAX_IN_FLIGHT,
+                 window=ADJUST_WINDOW, attempts=RETRY_ATTEMPTS):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.window = window
+        self.attempts = attempts
+        self.condition = threading.Condition()
+        self.in_flight = 0
+        self.window_start = time.monotonic()
+        self.window_bytes = 0
+        self.window_saturated = False
+        self.last_throughput = 0.0
+        self.last_decrease = 0.0
+        self.retries = 0
+        self.local = threading.local()
+
+    def call(self, fn, *args, **kwargs):
+        """Run ``fn`` in a slot, retrying transient failures.
+
+        Bytes moved by ``fn`` should be reported with ``record`` so they
+        count towards the throughput measurement.
+        """
+        for attempt in range(self.attempts):
+            self.local.attempt = attempt
+            self._acquire()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                retryable = is_retryable(e)
+                self._release(throttled=retryable)
+                if not retryable or attempt == self.attempts - 1:
+                    raise
+                with self.condition:
+                    self.retries += 1
+                time.sleep(backoff_delay(attempt))
+                continue
+            self._release()
+            return result
+
+    def attempt(self):
+        """Retry number (0 on the first try) of the call running in this thread."""
+        return getattr(self.local, "attempt", 0)
+
+    def record(self, nbytes):
+        with self.condition:
+            self.window_bytes += nbytes
+
+    def _acquire(self):
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.window_saturated = True
+                self.condition.wait()
+            self.in_flight += 1
+            if self.in_flight >= int(self.limit):
+                self.window_saturated = True
+
+    def _release(self, throttled=False):
+        with self.condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if throttled:
+                # multiplicative decrease ไม่เกินหนึ่งครั้งต่อ window
+                if now - self.last_decrease >= self.window:
+                    self.limit = max(self.minimum, self.limit / 2)
+                    self.last_throughput /= 2
+                    self.last_decrease = now
+                    self._reset_window(now)
+            else:
+                elapsed = now - self.window_start
+                if elapsed >= self.window:
+                    throughput = self.window_bytes / elapsed
+                    # additive increase เฉพาะเมื่อใช้ slot เต็มและ throughput ยังดีขึ้น
+                    if self.window_saturated and throughput >= self.last_throughput:
+                        self.limit = min(self.maximum, self.limit + 1)
+                    self.last_throughput = throughput
+                    self._reset_window(now)
+            self.condition.notify_all()
+
+    def _reset_window(self, now):
+        self.window_start = now
+        self.window_bytes = 0
+        self.window_saturated = False
+
+    def stats(self):
+        with self.condition:
+            return {
+                "limit": int(self.limit),
+                "in_flight": self.in_flight,
+                "throughput": self.last_throughput,
+                "retries": self.retries
+            }
+
+
+class TokenBucket:
+    """Byte-rate limiter shared by transfer threads.
+
+    ``consume`` takes tokens first and then sleeps off any debt, so a large
+    read is allowed through at once but the average rate still holds.
+    ``rate`` is in bytes per second; 0 means unlimited and it can be changed
+    while transfers are running.
+    """
+
+    def __init__(self, rate=0, burst=TOKEN_BUCKET_BURST):
+        self.lock = threading.Lock()
+        self.burst = burst
+        self.rate = 0
+        self.tokens = 0.0
+        self.updated = time.monotonic()
+        self.set_rate(rate)
+
+    def set_rate(self, rate):
+        with self.lock:
+            self.rate = max(0, rate)
+            # เริ่มนับใหม่เมื่อเปลี่ยนอัตรา เพื่อไม่ให้หนี้จากอัตราเดิมค้างอยู่
+            self.tokens = self.rate * self.burst
+            self.updated = time.monotonic()
+
+    def consume(self, nbytes):
+        with self.lock:
+            if not self.rate:
+                return
+            now = time.monotonic()
+            self.tokens = min(self.rate * self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= nbytes
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)